@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import csv
+import functools
 import io
 import os
 from typing import Any
@@ -75,19 +76,17 @@ def _default_exports_config() -> dict[str, Any]:
     return {"schema_version": 1, "entities": {"integration_blacklist": []}}
 
 
+@functools.lru_cache(maxsize=128)
+def _clean_blacklist(entries: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(sorted({entry.strip().lower() for entry in entries} - {""}))
+
+
 def _normalize_blacklist(raw: Any) -> list[str]:
     if raw is None:
         return []
-    if not isinstance(raw, list):
+    if not isinstance(raw, list) or not all(isinstance(entry, str) for entry in raw):
         raise ExportError("integration_blacklist must be a list of strings.")
-    cleaned: list[str] = []
-    for entry in raw:
-        if not isinstance(entry, str):
-            raise ExportError("integration_blacklist must be a list of strings.")
-        value = entry.strip().lower()
-        if value and value not in cleaned:
-            cleaned.append(value)
-    return sorted(cleaned)
+    return list(_clean_blacklist(tuple(raw)))
 
 
 def _normalize_exports_config(payload: Any) -> dict[str, Any]:
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import contextlib
 import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from stat import S_IMODE
 from typing import Any, Iterable
 
 import yaml
 
 from . import settings
-from .yaml_tags import GitopsYamlDumper, GitopsYamlLoader
+from .yaml_tags import (
+    GitopsFastYamlDumper,
+    GitopsYamlDumper,
+    GitopsYamlLoader,
+    mtime_is_racy,
+)
+
+# Read once at import, while nothing else can race the set-and-restore.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 
 def read_text(path: Path) -> str:
@@ -21,6 +37,36 @@ def hash_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
+def content_digest(payload: bytes) -> bytes:
+    """Return a 128-bit blake2b digest for in-process change detection.
+
+    Cheaper than `hash_text`, but never persist it: stored sync state keeps using sha256.
+    """
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    """Write `data` to `path` via a unique sibling temp file and `os.replace`.
+
+    Concurrent readers see either the old or the new file, never a partial write. The file keeps
+    its permission bits; new files get the mode a plain write would have created.
+    """
+    try:
+        mode = S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_name)
+        raise
+
+
 def file_hash(path: Path) -> str:
     return hash_text(read_text(path))
 
@@ -40,22 +86,81 @@ def modules_hash(paths: Iterable[Path]) -> str:
     return hasher.hexdigest()
 
 
+# Parsed YAML per path, keyed by the file's (size, mtime_ns). Data is stored pickled so every hit
+# hands out a fresh object tree that callers may mutate.
+_YAML_LOAD_CACHE_SIZE = 2000
+_YAML_LOAD_CACHE: OrderedDict[
+    str, tuple[tuple[int, int], bytes, tuple[int, ...] | None, str | None]
+] = OrderedDict()
+_YAML_LOAD_CACHE_LOCK = threading.Lock()
+
+
+def forget_yaml_load(path: Path) -> None:
+    """Drop the cached parse of `path`; call after writing or deleting it."""
+    with _YAML_LOAD_CACHE_LOCK:
+        _YAML_LOAD_CACHE.pop(os.fspath(path), None)
+
+
 def yaml_load(path: Path) -> tuple[Any, list[int] | None, str | None]:
+    """Load `path` with GitopsYamlLoader, returning (data, list item lines, error).
+
+    Parses are cached per path while the file's size and mtime are unchanged. Files modified
+    within the last second are not cached, since their stat key cannot yet be trusted.
+    """
+    key = os.fspath(path)
+    try:
+        stat_result = os.stat(key)
+    except FileNotFoundError:
+        # Missing files load as empty, like read_text; no need to open them.
+        forget_yaml_load(path)
+        return None, None, None
+    if stat_result.st_size == 0:
+        return None, None, None
+    stat_key = (stat_result.st_size, stat_result.st_mtime_ns)
+    with _YAML_LOAD_CACHE_LOCK:
+        cached = _YAML_LOAD_CACHE.get(key)
+        if cached is not None and cached[0] == stat_key:
+            _YAML_LOAD_CACHE.move_to_end(key)
+    if cached is not None and cached[0] == stat_key:
+        _stat_key, payload, lines, error = cached
+        return pickle.loads(payload), list(lines) if lines is not None else None, error
+
+    data, lines, error = _yaml_load_uncached(path)
+    if mtime_is_racy(stat_result.st_mtime_ns):
+        return data, lines, error
+    try:
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return data, lines, error
+    with _YAML_LOAD_CACHE_LOCK:
+        _YAML_LOAD_CACHE[key] = (
+            stat_key,
+            payload,
+            tuple(lines) if lines is not None else None,
+            error,
+        )
+        _YAML_LOAD_CACHE.move_to_end(key)
+        while len(_YAML_LOAD_CACHE) > _YAML_LOAD_CACHE_SIZE:
+            _YAML_LOAD_CACHE.popitem(last=False)
+    return data, lines, error
+
+
+def _yaml_load_uncached(path: Path) -> tuple[Any, list[int] | None, str | None]:
     text = read_text(path)
     if not text.strip():
         return None, None, None
+    # Compose and construct from one parse so list item line numbers come from the same node tree.
+    loader = GitopsYamlLoader(text)
     try:
-        data = yaml.load(text, Loader=GitopsYamlLoader)
+        node = loader.get_single_node()
+        data = loader.construct_document(node) if node is not None else None
     except yaml.YAMLError as exc:
         return None, None, f"{path.relative_to(settings.CONFIG_DIR)}: {exc}"
+    finally:
+        loader.dispose()
     lines = None
-    if isinstance(data, list):
-        try:
-            node = yaml.compose(text)
-        except yaml.YAMLError:
-            node = None
-        if isinstance(node, yaml.SequenceNode):
-            lines = [child.start_mark.line + 1 for child in node.value]
+    if isinstance(data, list) and isinstance(node, yaml.SequenceNode):
+        lines = [child.start_mark.line + 1 for child in node.value]
     return data, lines, None
 
 
@@ -72,10 +177,193 @@ def yaml_dump(data: Any) -> str:
     return rendered.rstrip() + "\n"
 
 
-def write_yaml_if_changed(path: Path, data: Any) -> bool:
+def yaml_dump_fast(data: Any) -> str:
+    """Render YAML for item editor responses using the LibYAML emitter when available.
+
+    Tagged values render as `yaml_dump` writes them, so edited text round-trips to disk unchanged.
+    """
+    if data is None:
+        return ""
+    rendered = yaml.dump(
+        data,
+        Dumper=GitopsFastYamlDumper,
+        sort_keys=False,
+        default_flow_style=False,
+        allow_unicode=True,
+    )
+    return rendered.rstrip() + "\n"
+
+
+class DirStatCache:
+    """Memoize `os.scandir` listings so sibling files share one directory scan.
+
+    Intended for a single sync pass: entries go stale once files change on disk, so callers that
+    write through the cache must call `invalidate` afterwards.
+    """
+
+    def __init__(self) -> None:
+        self._dirs: dict[str, dict[str, os.DirEntry[str]]] = {}
+
+    def stat(self, path: Path) -> os.stat_result | None:
+        parent = os.fspath(path.parent)
+        entries = self._dirs.get(parent)
+        if entries is None:
+            entries = {}
+            try:
+                with os.scandir(parent) as iterator:
+                    for entry in iterator:
+                        entries[entry.name] = entry
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            self._dirs[parent] = entries
+        entry = entries.get(path.name)
+        if entry is None or not entry.is_file():
+            return None
+        return entry.stat()
+
+    def invalidate(self, path: Path) -> None:
+        self._dirs.pop(os.fspath(path.parent), None)
+
+
+def list_yaml_files(root: Path, *, exclude_dirs: Iterable[Path] = ()) -> list[Path]:
+    """Return YAML files below `root` (unsorted), walking with `os.scandir`.
+
+    Matches `Path.rglob("*")` filtered to files: symlinked files are listed, symlinked directories
+    are not descended into. Directories in `exclude_dirs` are skipped entirely.
+    """
+    excluded = {os.fspath(path) for path in exclude_dirs}
+    files: list[Path] = []
+    pending = [os.fspath(root)]
+    while pending:
+        current = pending.pop()
+        try:
+            iterator = os.scandir(current)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in excluded:
+                        pending.append(entry.path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in settings.WATCH_EXTENSIONS:
+                    continue
+                if entry.is_file():
+                    files.append(Path(entry.path))
+    return files
+
+
+def yaml_tree_signature(root: Path) -> bytes | None:
+    """Digest the path, size and mtime of every YAML file below `root` (skipping `.git`).
+
+    Only meant for in-process change detection; mtimes must never be persisted. Returns None when
+    any file's mtime is racy, since a same-size rewrite could then keep the same signature.
+    """
+    entries: list[str] = []
+    pending = [os.fspath(root)]
+    while pending:
+        current = pending.pop()
+        try:
+            iterator = os.scandir(current)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".git":
+                        pending.append(entry.path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in settings.WATCH_EXTENSIONS:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if mtime_is_racy(stat.st_mtime_ns):
+                    return None
+                entries.append(f"{entry.path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    entries.sort()
+    return content_digest("\n".join(entries).encode("utf-8"))
+
+
+def content_matches(path: Path, rendered: str, dir_cache: DirStatCache | None = None) -> bool:
+    """Return True when `path` already holds `rendered` (a missing file reads as "").
+
+    With a `dir_cache`, missing files and files smaller than the encoded payload are decided
+    without reading them. Larger files are still read because newline translation can shrink them.
+    """
+    if dir_cache is not None:
+        stat_result = dir_cache.stat(path)
+        if stat_result is None:
+            return rendered == ""
+        if stat_result.st_size < len(rendered.encode("utf-8")):
+            return False
+    return rendered == read_text(path)
+
+
+# Last payload known to be on disk per path, with the file's (size, mtime_ns) at that moment.
+# Process-local: a restart simply falls back to rendering and comparing.
+_LAST_WRITTEN_YAML: dict[str, tuple[bytes, tuple[int, int] | None]] = {}
+
+
+def _stat_key(path: Path, dir_cache: DirStatCache | None) -> tuple[int, int] | None:
+    if dir_cache is not None:
+        stat_result = dir_cache.stat(path)
+    else:
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            stat_result = None
+    if stat_result is None:
+        return None
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+def yaml_payload_digest(data: Any) -> bytes:
+    """Digest `data` by its repr, which preserves key order and scalar types like the dump does."""
+    return content_digest(repr(data).encode("utf-8"))
+
+
+def yaml_write_is_current(
+    path: Path, digest: bytes, dir_cache: DirStatCache | None = None
+) -> bool:
+    """Return True when `digest` was last seen on disk at `path` and the file is untouched since.
+
+    Lets callers skip rendering and re-reading files whose payload has not changed.
+    """
+    memo = _LAST_WRITTEN_YAML.get(os.fspath(path))
+    if memo is None or memo[0] != digest:
+        return False
+    return memo[1] == _stat_key(path, dir_cache)
+
+
+def remember_yaml_write(
+    path: Path, digest: bytes, dir_cache: DirStatCache | None = None
+) -> None:
+    """Record that `path` now holds the payload behind `digest`.
+
+    Nothing is recorded while the file's mtime is racy; callers then keep comparing content.
+    """
+    key = os.fspath(path)
+    stat_key = _stat_key(path, dir_cache)
+    if stat_key is None or mtime_is_racy(stat_key[1]):
+        _LAST_WRITTEN_YAML.pop(key, None)
+        return
+    _LAST_WRITTEN_YAML[key] = (digest, stat_key)
+
+
+def write_yaml_if_changed(path: Path, data: Any, dir_cache: DirStatCache | None = None) -> bool:
+    digest = yaml_payload_digest(data)
+    if yaml_write_is_current(path, digest, dir_cache):
+        return False
     rendered = yaml_dump(data)
-    if rendered == read_text(path):
+    if content_matches(path, rendered, dir_cache):
+        remember_yaml_write(path, digest, dir_cache)
         return False
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(rendered, encoding="utf-8")
+    forget_yaml_load(path)
+    if dir_cache is not None:
+        dir_cache.invalidate(path)
+    remember_yaml_write(path, digest)
     return True
@@ -23,6 +23,20 @@ def run_git(args: Iterable[str], check: bool = True) -> subprocess.CompletedProc
     )
 
 
+def start_git(args: Iterable[str]) -> subprocess.Popen:
+    """Start a git command without waiting for it; read its text stdout via `communicate()`.
+
+    Lets independent git calls overlap instead of paying for each process in turn.
+    """
+    return subprocess.Popen(
+        ["git", *args],
+        cwd=settings.CONFIG_DIR,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+
 def run_git_bytes(args: Iterable[str], check: bool = True) -> subprocess.CompletedProcess:
     return subprocess.run(
         ["git", *args],
@@ -244,8 +258,13 @@ def git_list_files(mode: str = "changed", include_ignored: bool = False) -> list
             files.append({**change, "clean": clean})
         return files
 
-    tracked_result = run_git(["ls-files", "-z"], check=False)
-    tracked = [entry for entry in tracked_result.stdout.split("\0") if entry]
+    # ls-files runs while git status does; neither depends on the other.
+    tracked_process = start_git(["ls-files", "-z"])
+    try:
+        changes = git_status_entries(include_ignored=include_ignored)
+    finally:
+        tracked_stdout, _stderr = tracked_process.communicate()
+    tracked = [entry for entry in tracked_stdout.split("\0") if entry]
     files: dict[str, dict[str, Any]] = {}
     for path in tracked:
         files[path] = {
@@ -260,7 +279,7 @@ def git_list_files(mode: str = "changed", include_ignored: bool = False) -> list
             "clean": True,
         }
 
-    for change in git_status_entries(include_ignored=include_ignored):
+    for change in changes:
         if change["ignored"] and not include_ignored:
             continue
         entry = files.get(change["path"])
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
 from typing import Any
@@ -31,19 +32,17 @@ def _default_groups_config() -> dict[str, Any]:
     return {"schema_version": 1, "ignored": {"entity_ids": []}}
 
 
+@functools.lru_cache(maxsize=128)
+def _clean_entity_ids(entries: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(sorted({entry.strip().lower() for entry in entries} - {""}))
+
+
 def _normalize_entity_ids(value: Any) -> list[str]:
     if value is None:
         return []
-    if not isinstance(value, list):
+    if not isinstance(value, list) or not all(isinstance(entry, str) for entry in value):
         raise GroupsError("ignored.entity_ids must be a list of strings.")
-    cleaned: list[str] = []
-    for entry in value:
-        if not isinstance(entry, str):
-            raise GroupsError("ignored.entity_ids must be a list of strings.")
-        entity_id = entry.strip().lower()
-        if entity_id and entity_id not in cleaned:
-            cleaned.append(entity_id)
-    return sorted(cleaned)
+    return list(_clean_entity_ids(tuple(value)))
 
 
 def _normalize_groups_config(payload: Any) -> dict[str, Any]:
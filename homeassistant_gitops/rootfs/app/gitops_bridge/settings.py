@@ -17,4 +17,5 @@ PACKAGES_DIR = CONFIG_DIR / "packages"
 SYSTEM_EXPORTS_DIR = CONFIG_DIR / "system"
 WATCH_EXTENSIONS = {".yaml", ".yml"}
 DEBOUNCE_SECONDS = 0.6
+FORCE_FULL_SYNC = os.environ.get("GITOPS_FORCE_FULL_SYNC") == "1"
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
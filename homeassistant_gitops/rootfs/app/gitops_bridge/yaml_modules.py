@@ -4,19 +4,54 @@ import copy
 import difflib
 import hashlib
 import json
+import operator
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Hashable, Iterable
 
 import yaml
 
 from . import settings
 from .config_store import ensure_gitops_dirs
-from .fs_utils import file_hash, modules_hash, read_text, write_yaml_if_changed, yaml_dump, yaml_load
+from .fs_utils import (
+    DirStatCache,
+    content_digest,
+    content_matches,
+    file_hash,
+    forget_yaml_load,
+    hash_text,
+    list_yaml_files,
+    modules_hash,
+    read_text,
+    remember_yaml_write,
+    write_bytes_atomic,
+    write_yaml_if_changed,
+    yaml_dump,
+    yaml_dump_fast,
+    yaml_load,
+    yaml_payload_digest,
+    yaml_tree_signature,
+    yaml_write_is_current,
+)
 from .yaml_tags import SKIP, TaggedValue, expand_includes, is_template_tag, resolve_template_candidates
 
 
+_CONFIG_DIR_PREFIX = settings.CONFIG_DIR.as_posix().rstrip("/") + "/"
+
+
+def _rel_posix(path: Path) -> str:
+    """Return `path` relative to the config dir as a posix string.
+
+    Paths under the config dir are handled with a string prefix strip; anything else falls back to
+    `Path.relative_to`, which raises ValueError for paths outside the config dir.
+    """
+    text = path.as_posix()
+    if text.startswith(_CONFIG_DIR_PREFIX):
+        return text[len(_CONFIG_DIR_PREFIX) :]
+    return path.relative_to(settings.CONFIG_DIR).as_posix()
+
+
 @dataclass(frozen=True)
 class DomainSpec:
     key: str
@@ -64,6 +99,25 @@ class LovelaceModule:
     valid: bool
 
 
+@dataclass(frozen=True, slots=True, eq=False)
+class ResolvedSelector:
+    """Item selector validated once at the API boundary; `raw` is echoed back in responses."""
+
+    raw: dict[str, Any]
+    identity: Hashable
+    id: Any
+    fingerprint: Any
+    key: Any
+    helper_type: Any
+
+
+@dataclass(frozen=True)
+class DomainSyncSnapshot:
+    signatures: dict[str, bytes | None]
+    state: dict[str, Any]
+    warnings: tuple[str, ...]
+
+
 YAML_MODULE_DOMAINS = [
     DomainSpec(
         key="automation",
@@ -141,6 +195,17 @@ HELPER_TYPES = [
 
 HELPERS_DOMAIN_KEY = "helpers"
 
+_DOMAINS_BY_KEY = {spec.key: spec for spec in YAML_MODULE_DOMAINS}
+_DOMAINS_BY_PACKAGE_FILENAME = {spec.package_filename: spec for spec in YAML_MODULE_DOMAINS}
+
+# Config-relative paths of every generated domain file (build targets in previews).
+_DOMAIN_YAML_PATHS = frozenset(
+    [
+        *(_rel_posix(spec.domain_file) for spec in YAML_MODULE_DOMAINS),
+        *(f"{helper}.yaml" for helper in HELPER_TYPES),
+    ]
+)
+
 
 def list_changed_domains(paths: Iterable[str]) -> set[str]:
     domains: set[str] = set()
@@ -204,7 +269,7 @@ def _build_automation_blocks() -> dict[str, list[str]]:
     entries: dict[str, list[str]] = {}
     for file_path in sorted(automations_dir.glob("*.y*ml")):
         contents = read_text(file_path)
-        rel_path = str(file_path.relative_to(settings.CONFIG_DIR))
+        rel_path = _rel_posix(file_path)
         block = [
             f"# BEGIN {rel_path}",
             contents.rstrip(),
@@ -226,7 +291,7 @@ def merge_automations() -> list[str]:
     if not existing_lines:
         new_content = "\n".join(line for block in blocks.values() for line in block).strip() + "\n"
         merged_path.write_text(new_content, encoding="utf-8")
-        return [str(merged_path.relative_to(settings.CONFIG_DIR))]
+        return [_rel_posix(merged_path)]
 
     output: list[str] = []
     used_blocks: set[str] = set()
@@ -258,7 +323,7 @@ def merge_automations() -> list[str]:
     old_content = "\n".join(existing_lines).strip() + "\n"
     if new_content != old_content:
         merged_path.write_text(new_content, encoding="utf-8")
-        return [str(merged_path.relative_to(settings.CONFIG_DIR))]
+        return [_rel_posix(merged_path)]
     return []
 
 
@@ -278,7 +343,7 @@ def update_source_from_markers() -> list[str]:
             return
         current_file.parent.mkdir(parents=True, exist_ok=True)
         current_file.write_text("\n".join(buffer).strip() + "\n", encoding="utf-8")
-        updated.append(str(current_file.relative_to(settings.CONFIG_DIR)))
+        updated.append(_rel_posix(current_file))
         buffer = []
 
     for line in lines:
@@ -386,22 +451,22 @@ def _ensure_unassigned_path(
     if not new_path.exists():
         legacy_path.rename(new_path)
         warnings.append(
-            f"Migrated {legacy_path.relative_to(settings.CONFIG_DIR)} to "
-            f"{new_path.relative_to(settings.CONFIG_DIR)}."
+            f"Migrated {_rel_posix(legacy_path)} to "
+            f"{_rel_posix(new_path)}."
         )
         return new_path
     try:
         _merge_legacy_unassigned(legacy_path, new_path, module_dir, spec)
     except ValueError as exc:
         warnings.append(
-            f"Unable to merge legacy unassigned file {legacy_path.relative_to(settings.CONFIG_DIR)} "
-            f"into {new_path.relative_to(settings.CONFIG_DIR)}: {exc}"
+            f"Unable to merge legacy unassigned file {_rel_posix(legacy_path)} "
+            f"into {_rel_posix(new_path)}: {exc}"
         )
         return new_path
     legacy_path.unlink()
     warnings.append(
-        f"Merged {legacy_path.relative_to(settings.CONFIG_DIR)} into "
-        f"{new_path.relative_to(settings.CONFIG_DIR)}."
+        f"Merged {_rel_posix(legacy_path)} into "
+        f"{_rel_posix(new_path)}."
     )
     return new_path
 
@@ -423,15 +488,26 @@ def _normalize_value(value: Any, exclude_keys: set[str]) -> Any:
     return value
 
 
+def _fingerprint_default(value: Any) -> Any:
+    if isinstance(value, TaggedValue):
+        return {"__tag__": value.tag, "__value__": value.value}
+    return str(value)
+
+
+_FINGERPRINT_ENCODER = json.JSONEncoder(
+    sort_keys=True,
+    separators=(",", ":"),
+    ensure_ascii=False,
+    default=_fingerprint_default,
+)
+
+
 def _fingerprint(value: Any, exclude_keys: set[str]) -> str:
-    normalized = _normalize_value(value, exclude_keys)
-    payload = json.dumps(
-        normalized,
-        sort_keys=True,
-        separators=(",", ":"),
-        ensure_ascii=False,
-        default=str,
-    )
+    # Tagged values are expanded by the encoder's default hook, so the
+    # normalized copy is only needed when keys have to be dropped.
+    if exclude_keys:
+        value = _normalize_value(value, exclude_keys)
+    payload = _FINGERPRINT_ENCODER.encode(value)
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
 
 
@@ -565,22 +641,34 @@ def _merge_domain_value_preserving_templates(
     return copy.deepcopy(domain_value)
 
 
-def _build_template_diff(template_rel: str, old_text: str, new_text: str) -> str:
+def _unified_diff_text(rel_path: str, old_text: str, new_text: str) -> str:
+    """Render a git-style unified diff for `rel_path`, or "" when the contents match.
+
+    Identical inputs return before any line splitting so the common no-op case never reaches
+    difflib's sequence matcher.
+    """
+    if old_text == new_text:
+        return ""
     old_lines = old_text.splitlines()
     new_lines = new_text.splitlines()
-    diff_lines = list(
+    if old_lines == new_lines:
+        return ""
+    diff_text = "\n".join(
         difflib.unified_diff(
             old_lines,
             new_lines,
-            fromfile=f"a/{template_rel}",
-            tofile=f"b/{template_rel}",
+            fromfile=f"a/{rel_path}",
+            tofile=f"b/{rel_path}",
             lineterm="",
         )
     )
-    if not diff_lines:
+    if not diff_text:
         return ""
-    diff_text = "\n".join(diff_lines)
-    return f"diff --git a/{template_rel} b/{template_rel}\n{diff_text}\n"
+    return f"diff --git a/{rel_path} b/{rel_path}\n{diff_text}\n"
+
+
+def _build_template_diff(template_rel: str, old_text: str, new_text: str) -> str:
+    return _unified_diff_text(template_rel, old_text, new_text)
 
 
 def _write_template_diffs(
@@ -598,7 +686,7 @@ def _write_template_diffs(
 
     for template_path, candidates in by_template.items():
         try:
-            template_rel = template_path.relative_to(settings.CONFIG_DIR).as_posix()
+            template_rel = _rel_posix(template_path)
         except ValueError:
             warnings.append(
                 f"Template diff skipped for {template_path.as_posix()}: outside config dir."
@@ -639,7 +727,7 @@ def _write_template_diffs(
 
         diff_path = template_path.parent / f"{template_path.name}.diff"
         if _write_text(diff_path, header + diff_text, preview):
-            changed.append(diff_path.relative_to(settings.CONFIG_DIR).as_posix())
+            changed.append(_rel_posix(diff_path))
     return changed
 
 
@@ -752,10 +840,10 @@ def _load_storage_json(path: Path, warnings: list[str]) -> dict[str, Any] | None
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
     except json.JSONDecodeError as exc:
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)}: {exc}")
+        warnings.append(f"{_rel_posix(path)}: {exc}")
         return None
     if not isinstance(data, dict):
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a JSON object.")
+        warnings.append(f"{_rel_posix(path)} is not a JSON object.")
         return None
     return data
 
@@ -787,6 +875,109 @@ def _list_module_files(spec: DomainSpec) -> list[Path]:
     return files
 
 
+def _list_helper_module_files() -> list[Path]:
+    files: list[Path] = []
+    if settings.PACKAGES_DIR.exists():
+        for package_dir in sorted(settings.PACKAGES_DIR.iterdir()):
+            if not package_dir.is_dir():
+                continue
+            candidate = package_dir / "helpers.yaml"
+            if candidate.exists():
+                files.append(candidate)
+    helpers_dir = settings.CONFIG_DIR / "helpers"
+    if helpers_dir.exists():
+        files.extend(sorted(helpers_dir.glob("*.y*ml")))
+    return files
+
+
+def _domain_sync_inputs(spec: DomainSpec) -> list[Path]:
+    return [*_list_module_files(spec), spec.domain_file, _mapping_path(spec.key)]
+
+
+def _helpers_sync_inputs() -> list[Path]:
+    return [
+        *_list_helper_module_files(),
+        *(settings.CONFIG_DIR / f"{helper}.yaml" for helper in HELPER_TYPES),
+        _mapping_path(HELPERS_DOMAIN_KEY),
+    ]
+
+
+def _input_signatures(paths: Iterable[Path]) -> dict[str, bytes | None]:
+    signatures: dict[str, bytes | None] = {}
+    for path in paths:
+        try:
+            signatures[path.as_posix()] = content_digest(path.read_bytes())
+        except FileNotFoundError:
+            signatures[path.as_posix()] = None
+    return signatures
+
+
+# Last full sync of each domain, keyed by domain key. Kept in-process only so volatile data never
+# lands in the committed sync state.
+_DOMAIN_SYNC_SNAPSHOTS: dict[str, DomainSyncSnapshot] = {}
+
+
+def _replay_unchanged_domain_sync(
+    domain_key: str,
+    inputs: list[Path],
+    state: dict[str, Any],
+    warnings: list[str],
+    preference_override: str | None,
+    write_mode: str,
+) -> bool:
+    """Skip a domain sync whose inputs are byte-identical to its last full sync.
+
+    Returns True when the sync can be skipped; the warnings from the snapshot run are replayed
+    into `warnings` so callers see the same report. Overrides, partial write modes and
+    `GITOPS_FORCE_FULL_SYNC=1` always run the full sync.
+    """
+    if settings.FORCE_FULL_SYNC or preference_override is not None or write_mode != "all":
+        return False
+    snapshot = _DOMAIN_SYNC_SNAPSHOTS.get(domain_key)
+    if snapshot is None:
+        return False
+    if state.get("domains", {}).get(domain_key) != snapshot.state:
+        return False
+    if _input_signatures(inputs) != snapshot.signatures:
+        return False
+    warnings.extend(snapshot.warnings)
+    return True
+
+
+def _record_domain_sync(
+    domain_key: str,
+    inputs: list[Path],
+    state: dict[str, Any],
+    emitted_warnings: list[str],
+    *,
+    cacheable: bool,
+    preview: dict[str, str] | None,
+    preference_override: str | None,
+    write_mode: str,
+) -> None:
+    """Remember the inputs of a completed full domain sync for `_replay_unchanged_domain_sync`.
+
+    Domains with tagged values are never cached because their output also depends on template
+    and include files outside the domain inputs.
+    """
+    if preview is not None:
+        return
+    if not cacheable or preference_override is not None or write_mode != "all":
+        _DOMAIN_SYNC_SNAPSHOTS.pop(domain_key, None)
+        return
+    _DOMAIN_SYNC_SNAPSHOTS[domain_key] = DomainSyncSnapshot(
+        signatures=_input_signatures(inputs),
+        state=dict(state.get("domains", {}).get(domain_key, {})),
+        warnings=tuple(emitted_warnings),
+    )
+
+
+def _items_contain_tagged_values(*item_maps: dict[str, ModuleItem]) -> bool:
+    return any(
+        _contains_tagged_values(item.data) for items in item_maps for item in items.values()
+    )
+
+
 def _load_sync_state() -> tuple[dict[str, Any], list[str]]:
     if not settings.SYNC_STATE_PATH.exists():
         return {"schema_version": 1, "domains": {}, "has_run": False}, []
@@ -836,7 +1027,7 @@ def _load_mapping(domain_key: str, unassigned_rel: str) -> tuple[dict[str, Any],
             "domain": domain_key,
             "unassigned_path": unassigned_rel,
             "entries": [],
-        }, [f"{path.relative_to(settings.CONFIG_DIR)}: {exc}"]
+        }, [f"{_rel_posix(path)}: {exc}"]
     if not isinstance(data, dict):
         data = {}
     data.setdefault("schema_version", 1)
@@ -857,16 +1048,29 @@ def _save_mapping(domain_key: str, mapping: dict[str, Any], preview: bool = Fals
     path.write_text(yaml_dump(mapping), encoding="utf-8")
 
 
-def _write_yaml(path: Path, data: Any, preview: dict[str, str] | None) -> bool:
+def _write_yaml(
+    path: Path,
+    data: Any,
+    preview: dict[str, str] | None,
+    dir_cache: DirStatCache | None = None,
+) -> bool:
+    digest = yaml_payload_digest(data)
+    if yaml_write_is_current(path, digest, dir_cache):
+        return False
     rendered = yaml_dump(data)
-    if rendered == read_text(path):
+    if content_matches(path, rendered, dir_cache):
+        remember_yaml_write(path, digest, dir_cache)
         return False
     if preview is not None:
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         preview[rel_path] = rendered
         return True
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(rendered, encoding="utf-8")
+    forget_yaml_load(path)
+    if dir_cache is not None:
+        dir_cache.invalidate(path)
+    remember_yaml_write(path, digest)
     return True
 
 
@@ -880,7 +1084,7 @@ def _is_empty_yaml_payload(data: Any) -> bool:
 
 def _write_domain_yaml(path: Path, data: Any, preview: dict[str, str] | None) -> bool:
     if _is_empty_yaml_payload(data):
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         if preview is not None:
             if path.exists():
                 preview[rel_path] = ""
@@ -888,6 +1092,7 @@ def _write_domain_yaml(path: Path, data: Any, preview: dict[str, str] | None) ->
             return False
         if path.exists():
             path.unlink()
+            forget_yaml_load(path)
             return True
         return False
     return _write_yaml(path, data, preview)
@@ -895,13 +1100,14 @@ def _write_domain_yaml(path: Path, data: Any, preview: dict[str, str] | None) ->
 
 def _write_text(path: Path, content: str, preview: dict[str, str] | None) -> bool:
     if preview is not None:
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         preview[rel_path] = content
         return True
     if content == read_text(path):
         return False
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(content, encoding="utf-8")
+    forget_yaml_load(path)
     return True
 
 
@@ -912,6 +1118,15 @@ def _mapping_entry_key(entry: dict[str, Any]) -> str:
     return str(entry.get("id"))
 
 
+_ORDER_KEY = operator.attrgetter("order")
+
+
+def _sort_items_by_order(items_by_file: dict[str, list[ModuleItem]]) -> None:
+    """Sort each file's items by `order` in place so later passes can iterate them directly."""
+    for items in items_by_file.values():
+        items.sort(key=_ORDER_KEY)
+
+
 def _parse_list_items(
     data: Any,
     lines: list[int] | None,
@@ -919,7 +1134,14 @@ def _parse_list_items(
     spec: DomainSpec,
     warnings: list[str],
     used_ids: set[str] | None = None,
+    *,
+    mutate: bool = True,
 ) -> tuple[list[ModuleItem], bool]:
+    """Parse list entries into ModuleItems, assigning ids to entries that lack one.
+
+    With `mutate=False` the parsed data is treated as read-only: generated ids are only used for
+    the returned items and never written back into the entries.
+    """
     if data is None:
         data = []
     if not isinstance(data, list):
@@ -927,7 +1149,12 @@ def _parse_list_items(
         return [], False
     items: list[ModuleItem] = []
     changed = False
-    exclude_keys = {spec.id_field} if spec.id_field else set()
+    id_field = spec.id_field
+    domain_key = spec.key
+    write_ids = bool(id_field and spec.auto_id and mutate)
+    config_dir = settings.CONFIG_DIR
+    base_path = config_dir / rel_path
+    exclude_keys = {id_field} if id_field else set()
     id_set = used_ids if used_ids is not None else set()
     for idx, entry in enumerate(data):
         if not isinstance(entry, dict):
@@ -936,11 +1163,11 @@ def _parse_list_items(
         line = None
         if lines and idx < len(lines):
             line = lines[idx]
-        item_id = _extract_item_id(entry, spec.id_field)
+        item_id = _extract_item_id(entry, id_field)
         if item_id:
             id_set.add(item_id)
         else:
-            if spec.key == "automation":
+            if domain_key == "automation":
                 candidate = _automation_alias_id(entry)
                 if not candidate:
                     candidate = _synthetic_id(rel_path, line, idx)
@@ -948,16 +1175,16 @@ def _parse_list_items(
                 item_id = _ensure_unique_id(candidate, id_set, fingerprint)
             else:
                 item_id = _synthetic_id(rel_path, line, idx)
-                if spec.key == "lovelace":
+                if domain_key == "lovelace":
                     item_id = _sanitize_lovelace_path(item_id)
-            if spec.id_field and spec.auto_id:
-                entry[spec.id_field] = item_id
+            if write_ids:
+                entry[id_field] = item_id
                 changed = True
             id_set.add(item_id)
         expanded = expand_includes(
             entry,
-            config_dir=settings.CONFIG_DIR,
-            base_path=settings.CONFIG_DIR / rel_path,
+            config_dir=config_dir,
+            base_path=base_path,
             warnings=warnings,
             resolve_templates=True,
             resolve_ha_includes=False,
@@ -985,7 +1212,7 @@ def _parse_list_module_file(
     if error:
         warnings.append(error)
         return [], [], False, False
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     items, changed = _parse_list_items(data, lines, rel_path, spec, warnings, used_ids=used_ids)
     return items, data or [], changed, True
 
@@ -1000,9 +1227,9 @@ def _parse_mapping_module_file(
     if data is None:
         data = {}
     if not isinstance(data, dict):
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a map.")
+        warnings.append(f"{_rel_posix(path)} is not a map.")
         return [], {}, False, True
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     items: list[ModuleItem] = []
     for idx, (key, value) in enumerate(data.items()):
         expanded = expand_includes(
@@ -1038,7 +1265,7 @@ def _parse_list_domain(
     if error:
         warnings.append(error)
         return [], [], False, False
-    rel_path = spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(spec.domain_file)
     items, changed = _parse_list_items(data, lines, rel_path, spec, warnings, used_ids=used_ids)
     return items, data or [], changed, True
 
@@ -1053,9 +1280,9 @@ def _parse_mapping_domain(
     if data is None:
         data = {}
     if not isinstance(data, dict):
-        warnings.append(f"{spec.domain_file.relative_to(settings.CONFIG_DIR)} is not a map.")
+        warnings.append(f"{_rel_posix(spec.domain_file)} is not a map.")
         return [], {}, False, True
-    rel_path = spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(spec.domain_file)
     items: list[ModuleItem] = []
     for idx, (key, value) in enumerate(data.items()):
         expanded = expand_includes(
@@ -1088,7 +1315,7 @@ def _parse_lovelace_module(path: Path, warnings: list[str]) -> LovelaceModule:
     data, lines, error = yaml_load(path)
     if error:
         warnings.append(error)
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         return LovelaceModule(
             path=path,
             rel_path=rel_path,
@@ -1098,7 +1325,7 @@ def _parse_lovelace_module(path: Path, warnings: list[str]) -> LovelaceModule:
             changed=False,
             valid=False,
         )
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     shape = "list"
     meta: dict[str, Any] = {}
     views_data: list[Any] = []
@@ -1116,7 +1343,7 @@ def _parse_lovelace_module(path: Path, warnings: list[str]) -> LovelaceModule:
     else:
         warnings.append(f"{rel_path} is not a list or map.")
         views_data = []
-    spec = next(domain for domain in YAML_MODULE_DOMAINS if domain.key == "lovelace")
+    spec = _DOMAINS_BY_KEY["lovelace"]
     items, changed = _parse_list_items(views_data, lines, rel_path, spec, warnings)
     return LovelaceModule(
         path=path,
@@ -1139,14 +1366,14 @@ def _parse_lovelace_domain(
     if data is None:
         data = {}
     if not isinstance(data, dict):
-        warnings.append(f"{spec.domain_file.relative_to(settings.CONFIG_DIR)} is not a map.")
+        warnings.append(f"{_rel_posix(spec.domain_file)} is not a map.")
         data = {}
     views_data = data.get("views") or []
     if not isinstance(views_data, list):
-        warnings.append(f"{spec.domain_file.relative_to(settings.CONFIG_DIR)} views is not a list.")
+        warnings.append(f"{_rel_posix(spec.domain_file)} views is not a list.")
         views_data = []
     meta = {key: value for key, value in data.items() if key != "views"}
-    rel_path = spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(spec.domain_file)
     items, changed = _parse_list_items(views_data, lines, rel_path, spec, warnings)
     return items, meta, changed, True
 
@@ -1219,9 +1446,14 @@ def _sync_list_domain(
     preference_override: str | None = None,
     write_mode: str = "all",
 ) -> list[str]:
+    warnings_start = len(warnings)
+    if _replay_unchanged_domain_sync(
+        spec.key, _domain_sync_inputs(spec), state, warnings, preference_override, write_mode
+    ):
+        return []
     changed_files: list[str] = []
     unassigned_path = _ensure_unassigned_path(spec.module_dir, spec, warnings, preview)
-    unassigned_rel = unassigned_path.relative_to(settings.CONFIG_DIR).as_posix()
+    unassigned_rel = _rel_posix(unassigned_path)
     module_files = _list_module_files(spec)
     template_edits: list[TemplateEditCandidate] = []
     module_used_ids: set[str] | None = None
@@ -1247,7 +1479,7 @@ def _sync_list_domain(
         items, _data, injected, valid = _parse_list_module_file(
             path, spec, warnings, used_ids=module_used_ids
         )
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         if not valid:
             invalid_module_files.add(rel_path)
             continue
@@ -1272,7 +1504,7 @@ def _sync_list_domain(
         for item in domain_items:
             if item.ha_id in domain_items_by_id:
                 warnings.append(
-                    f"Duplicate {spec.key} id {item.ha_id} in {spec.domain_file.relative_to(settings.CONFIG_DIR)}."
+                    f"Duplicate {spec.key} id {item.ha_id} in {_rel_posix(spec.domain_file)}."
                 )
                 continue
             domain_items_by_id[item.ha_id] = item
@@ -1431,17 +1663,21 @@ def _sync_list_domain(
                 )
                 desired_items_by_file[source].append(domain_item)
 
+    _sort_items_by_order(desired_items_by_file)
+    dir_cache = DirStatCache()
     for rel_path, items in desired_items_by_file.items():
         if rel_path in invalid_module_files:
             continue
-        payload = [item.data for item in sorted(items, key=lambda item: item.order)]
-        if write_modules and _write_yaml(settings.CONFIG_DIR / rel_path, payload, preview):
+        payload = [item.data for item in items]
+        if write_modules and _write_yaml(
+            settings.CONFIG_DIR / rel_path, payload, preview, dir_cache
+        ):
             changed_files.append(rel_path)
 
     combined: list[Any] = []
     for rel_path in sorted(desired_items_by_file.keys()):
         items = desired_items_by_file[rel_path]
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             if item.expanded is None or item.expanded is SKIP:
                 warnings.append(
                     f"Skipping {spec.key} {item.ha_id} due to template expansion failure."
@@ -1451,11 +1687,11 @@ def _sync_list_domain(
     if write_modules:
         changed_files.extend(_write_template_diffs(template_edits, warnings, preview))
     if write_domain and _write_domain_yaml(spec.domain_file, combined, preview):
-        changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
+        changed_files.append(_rel_posix(spec.domain_file))
 
     entries: list[dict[str, Any]] = []
     for rel_path, items in desired_items_by_file.items():
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             entry: dict[str, Any] = {"id": item.ha_id, "source": rel_path}
             if item.name:
                 entry["name"] = item.name
@@ -1472,6 +1708,16 @@ def _sync_list_domain(
         "domain_hash": file_hash(spec.domain_file),
         "modules_hash": modules_hash(sorted(module_hash_paths)),
     }
+    _record_domain_sync(
+        spec.key,
+        _domain_sync_inputs(spec),
+        state,
+        warnings[warnings_start:],
+        cacheable=not _items_contain_tagged_values(module_items_by_id, domain_items_by_id),
+        preview=preview,
+        preference_override=preference_override,
+        write_mode=write_mode,
+    )
     return changed_files
 
 
@@ -1483,9 +1729,14 @@ def _sync_mapping_domain(
     preference_override: str | None = None,
     write_mode: str = "all",
 ) -> list[str]:
+    warnings_start = len(warnings)
+    if _replay_unchanged_domain_sync(
+        spec.key, _domain_sync_inputs(spec), state, warnings, preference_override, write_mode
+    ):
+        return []
     changed_files: list[str] = []
     unassigned_path = _ensure_unassigned_path(spec.module_dir, spec, warnings, preview)
-    unassigned_rel = unassigned_path.relative_to(settings.CONFIG_DIR).as_posix()
+    unassigned_rel = _rel_posix(unassigned_path)
     module_files = _list_module_files(spec)
     template_edits: list[TemplateEditCandidate] = []
     resolve_ha_includes = spec.key == "group"
@@ -1497,7 +1748,7 @@ def _sync_mapping_domain(
         items, _data, _injected, valid = _parse_mapping_module_file(
             path, warnings, resolve_ha_includes=resolve_ha_includes
         )
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         if not valid:
             invalid_module_files.add(rel_path)
             continue
@@ -1518,7 +1769,7 @@ def _sync_mapping_domain(
         for item in domain_items:
             if item.ha_id in domain_items_by_id:
                 warnings.append(
-                    f"Duplicate {spec.key} id {item.ha_id} in {spec.domain_file.relative_to(settings.CONFIG_DIR)}."
+                    f"Duplicate {spec.key} id {item.ha_id} in {_rel_posix(spec.domain_file)}."
                 )
                 continue
             domain_items_by_id[item.ha_id] = item
@@ -1673,18 +1924,22 @@ def _sync_mapping_domain(
                 )
                 desired_items_by_file[source].append(domain_item)
 
+    _sort_items_by_order(desired_items_by_file)
+    dir_cache = DirStatCache()
     for rel_path, items in desired_items_by_file.items():
         if rel_path in invalid_module_files:
             continue
         payload: dict[str, Any] = {
-            item.ha_id: item.data for item in sorted(items, key=lambda item: item.order)
+            item.ha_id: item.data for item in items
         }
-        if write_modules and _write_yaml(settings.CONFIG_DIR / rel_path, payload, preview):
+        if write_modules and _write_yaml(
+            settings.CONFIG_DIR / rel_path, payload, preview, dir_cache
+        ):
             changed_files.append(rel_path)
 
     combined: dict[str, Any] = {}
     for rel_path in sorted(desired_items_by_file.keys()):
-        for item in sorted(desired_items_by_file[rel_path], key=lambda item: item.order):
+        for item in desired_items_by_file[rel_path]:
             if item.ha_id in combined:
                 warnings.append(
                     f"Duplicate {spec.key} id {item.ha_id} across modules; keeping first."
@@ -1699,11 +1954,11 @@ def _sync_mapping_domain(
     if write_modules:
         changed_files.extend(_write_template_diffs(template_edits, warnings, preview))
     if write_domain and _write_domain_yaml(spec.domain_file, combined, preview):
-        changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
+        changed_files.append(_rel_posix(spec.domain_file))
 
     entries: list[dict[str, Any]] = []
     for rel_path, items in desired_items_by_file.items():
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             entry: dict[str, Any] = {"id": item.ha_id, "source": rel_path}
             if item.name:
                 entry["name"] = item.name
@@ -1720,6 +1975,16 @@ def _sync_mapping_domain(
         "domain_hash": file_hash(spec.domain_file),
         "modules_hash": modules_hash(sorted(module_hash_paths)),
     }
+    _record_domain_sync(
+        spec.key,
+        _domain_sync_inputs(spec),
+        state,
+        warnings[warnings_start:],
+        cacheable=not _items_contain_tagged_values(module_items_by_id, domain_items_by_id),
+        preview=preview,
+        preference_override=preference_override,
+        write_mode=write_mode,
+    )
     return changed_files
 
 
@@ -1731,9 +1996,14 @@ def _sync_lovelace_domain(
     preference_override: str | None = None,
     write_mode: str = "all",
 ) -> list[str]:
+    warnings_start = len(warnings)
+    if _replay_unchanged_domain_sync(
+        spec.key, _domain_sync_inputs(spec), state, warnings, preference_override, write_mode
+    ):
+        return []
     changed_files: list[str] = []
     unassigned_path = _ensure_unassigned_path(spec.module_dir, spec, warnings, preview)
-    unassigned_rel = unassigned_path.relative_to(settings.CONFIG_DIR).as_posix()
+    unassigned_rel = _rel_posix(unassigned_path)
     module_files = _list_module_files(spec)
     template_edits: list[TemplateEditCandidate] = []
     lovelace_modules: dict[str, LovelaceModule] = {}
@@ -1768,7 +2038,7 @@ def _sync_lovelace_domain(
         for item in domain_items:
             if item.ha_id in domain_items_by_id:
                 warnings.append(
-                    f"Duplicate lovelace view {item.ha_id} in {spec.domain_file.relative_to(settings.CONFIG_DIR)}."
+                    f"Duplicate lovelace view {item.ha_id} in {_rel_posix(spec.domain_file)}."
                 )
                 continue
             domain_items_by_id[item.ha_id] = item
@@ -1940,12 +2210,14 @@ def _sync_lovelace_domain(
         else:
             meta_payload = domain_meta
 
+    _sort_items_by_order(desired_items_by_file)
+    dir_cache = DirStatCache()
     for rel_path, items in desired_items_by_file.items():
         if rel_path in invalid_module_files:
             continue
         module = lovelace_modules.get(rel_path)
         shape = module.shape if module else "dict"
-        views_payload = [item.data for item in sorted(items, key=lambda item: item.order)]
+        views_payload = [item.data for item in items]
         if rel_path == meta_target:
             payload = {"views": views_payload, **meta_payload}
             shape = "dict"
@@ -1953,13 +2225,15 @@ def _sync_lovelace_domain(
             payload = {"views": views_payload}
         else:
             payload = views_payload
-        if write_modules and _write_yaml(settings.CONFIG_DIR / rel_path, payload, preview):
+        if write_modules and _write_yaml(
+            settings.CONFIG_DIR / rel_path, payload, preview, dir_cache
+        ):
             changed_files.append(rel_path)
 
     combined_views: list[Any] = []
     for rel_path in sorted(desired_items_by_file.keys()):
         items = desired_items_by_file[rel_path]
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             if item.expanded is None or item.expanded is SKIP:
                 warnings.append(
                     f"Skipping lovelace view {item.ha_id} due to template expansion failure."
@@ -1970,11 +2244,11 @@ def _sync_lovelace_domain(
     if write_modules:
         changed_files.extend(_write_template_diffs(template_edits, warnings, preview))
     if write_domain and _write_domain_yaml(spec.domain_file, domain_payload, preview):
-        changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
+        changed_files.append(_rel_posix(spec.domain_file))
 
     entries: list[dict[str, Any]] = []
     for rel_path, items in desired_items_by_file.items():
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             entry: dict[str, Any] = {"id": item.ha_id, "source": rel_path}
             if item.name:
                 entry["name"] = item.name
@@ -1991,6 +2265,20 @@ def _sync_lovelace_domain(
         "domain_hash": file_hash(spec.domain_file),
         "modules_hash": modules_hash(sorted(module_hash_paths)),
     }
+    _record_domain_sync(
+        spec.key,
+        _domain_sync_inputs(spec),
+        state,
+        warnings[warnings_start:],
+        cacheable=not (
+            _items_contain_tagged_values(module_items_by_id, domain_items_by_id)
+            or _contains_tagged_values(domain_meta)
+            or any(_contains_tagged_values(module.meta) for module in lovelace_modules.values())
+        ),
+        preview=preview,
+        preference_override=preference_override,
+        write_mode=write_mode,
+    )
     return changed_files
 
 
@@ -2001,21 +2289,17 @@ def _sync_helpers(
     preference_override: str | None = None,
     write_mode: str = "all",
 ) -> list[str]:
+    warnings_start = len(warnings)
+    if _replay_unchanged_domain_sync(
+        HELPERS_DOMAIN_KEY, _helpers_sync_inputs(), state, warnings, preference_override, write_mode
+    ):
+        return []
     changed_files: list[str] = []
     template_edits: list[TemplateEditCandidate] = []
     helpers_dir = settings.CONFIG_DIR / "helpers"
     unassigned_path = _ensure_unassigned_path(helpers_dir, None, warnings, preview)
-    unassigned_rel = unassigned_path.relative_to(settings.CONFIG_DIR).as_posix()
-    module_files: list[Path] = []
-    if settings.PACKAGES_DIR.exists():
-        for package_dir in sorted(settings.PACKAGES_DIR.iterdir()):
-            if not package_dir.is_dir():
-                continue
-            candidate = package_dir / "helpers.yaml"
-            if candidate.exists():
-                module_files.append(candidate)
-    if helpers_dir.exists():
-        module_files.extend(sorted(helpers_dir.glob("*.y*ml")))
+    unassigned_rel = _rel_posix(unassigned_path)
+    module_files = _list_helper_module_files()
 
     module_items_by_file: dict[str, list[ModuleItem]] = {}
     module_items_by_id: dict[str, ModuleItem] = {}
@@ -2025,15 +2309,15 @@ def _sync_helpers(
         data, _lines, error = yaml_load(path)
         if error:
             warnings.append(error)
-            invalid_module_files.add(path.relative_to(settings.CONFIG_DIR).as_posix())
+            invalid_module_files.add(_rel_posix(path))
             continue
         if data is None:
             data = {}
         if not isinstance(data, dict):
-            warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a map.")
-            invalid_module_files.add(path.relative_to(settings.CONFIG_DIR).as_posix())
+            warnings.append(f"{_rel_posix(path)} is not a map.")
+            invalid_module_files.add(_rel_posix(path))
             continue
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         items: list[ModuleItem] = []
         for helper_type, helper_values in data.items():
             if helper_type not in HELPER_TYPES:
@@ -2084,7 +2368,7 @@ def _sync_helpers(
         if data is None:
             data = {}
         if not isinstance(data, dict):
-            warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a map.")
+            warnings.append(f"{_rel_posix(path)} is not a map.")
             continue
         for idx, (key, value) in enumerate(data.items()):
             item_id = str(key)
@@ -2101,7 +2385,7 @@ def _sync_helpers(
             item = ModuleItem(
                 ha_id=item_id,
                 data=value,
-                source=path.relative_to(settings.CONFIG_DIR).as_posix(),
+                source=_rel_posix(path),
                 order=idx,
                 name=_item_name(expanded),
                 fingerprint=_fingerprint(expanded, set()),
@@ -2111,7 +2395,7 @@ def _sync_helpers(
             composite_id = f"{helper_type}:{item_id}"
             if composite_id in domain_items_by_id:
                 warnings.append(
-                    f"Duplicate helper {composite_id} in {path.relative_to(settings.CONFIG_DIR)}."
+                    f"Duplicate helper {composite_id} in {_rel_posix(path)}."
                 )
                 continue
             domain_items_by_id[composite_id] = item
@@ -2275,6 +2559,8 @@ def _sync_helpers(
     if write_modules:
         changed_files.extend(_write_template_diffs(template_edits, warnings, preview))
 
+    _sort_items_by_order(desired_items_by_file)
+    dir_cache = DirStatCache()
     for rel_path, items in desired_items_by_file.items():
         if rel_path in invalid_module_files:
             continue
@@ -2284,9 +2570,11 @@ def _sync_helpers(
             if not entries:
                 continue
             payload[helper_type] = {
-                item.ha_id: item.data for item in sorted(entries, key=lambda item: item.order)
+                item.ha_id: item.data for item in entries
             }
-        if write_modules and _write_yaml(settings.CONFIG_DIR / rel_path, payload, preview):
+        if write_modules and _write_yaml(
+            settings.CONFIG_DIR / rel_path, payload, preview, dir_cache
+        ):
             changed_files.append(rel_path)
 
     for helper_type in HELPER_TYPES:
@@ -2295,7 +2583,7 @@ def _sync_helpers(
             entries = [
                 item for item in desired_items_by_file[rel_path] if item.helper_type == helper_type
             ]
-            for item in sorted(entries, key=lambda item: item.order):
+            for item in entries:
                 if item.ha_id in combined:
                     warnings.append(
                         f"Duplicate helper {helper_type}:{item.ha_id} across modules; keeping first."
@@ -2309,11 +2597,11 @@ def _sync_helpers(
                 combined[item.ha_id] = item.expanded
         domain_path = settings.CONFIG_DIR / f"{helper_type}.yaml"
         if write_domain and _write_domain_yaml(domain_path, combined, preview):
-            changed_files.append(domain_path.relative_to(settings.CONFIG_DIR).as_posix())
+            changed_files.append(_rel_posix(domain_path))
 
     entries: list[dict[str, Any]] = []
     for rel_path, items in desired_items_by_file.items():
-        for item in sorted(items, key=lambda item: item.order):
+        for item in items:
             entry: dict[str, Any] = {
                 "id": item.ha_id,
                 "source": rel_path,
@@ -2334,6 +2622,16 @@ def _sync_helpers(
         "domain_hash": modules_hash([settings.CONFIG_DIR / f"{helper}.yaml" for helper in HELPER_TYPES]),
         "modules_hash": modules_hash(sorted(module_hash_paths)),
     }
+    _record_domain_sync(
+        HELPERS_DOMAIN_KEY,
+        _helpers_sync_inputs(),
+        state,
+        warnings[warnings_start:],
+        cacheable=not _items_contain_tagged_values(module_items_by_id, domain_items_by_id),
+        preview=preview,
+        preference_override=preference_override,
+        write_mode=write_mode,
+    )
     return changed_files
 
 
@@ -2343,7 +2641,7 @@ def reconcile_automation_ids() -> dict[str, Any]:
     changed_files: list[str] = []
     reconciled: list[dict[str, str]] = []
 
-    spec = next(domain for domain in YAML_MODULE_DOMAINS if domain.key == "automation")
+    spec = _DOMAINS_BY_KEY["automation"]
     if not spec.id_field:
         return {
             "status": "skipped",
@@ -2369,7 +2667,7 @@ def reconcile_automation_ids() -> dict[str, Any]:
         items, _data, _injected, valid = _parse_list_module_file(path, spec, warnings)
         if not valid:
             continue
-        rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_path = _rel_posix(path)
         module_items_by_file[rel_path] = items
         module_items.extend(items)
 
@@ -2421,9 +2719,10 @@ def reconcile_automation_ids() -> dict[str, Any]:
                 f"{fingerprint}; skipping."
             )
 
+    dir_cache = DirStatCache()
     for rel_path, items in module_items_by_file.items():
-        payload = [item.data for item in sorted(items, key=lambda item: item.order)]
-        if write_yaml_if_changed(settings.CONFIG_DIR / rel_path, payload):
+        payload = [item.data for item in sorted(items, key=_ORDER_KEY)]
+        if write_yaml_if_changed(settings.CONFIG_DIR / rel_path, payload, dir_cache):
             changed_files.append(rel_path)
 
     status = "reconciled" if reconciled else "no_changes"
@@ -2435,6 +2734,14 @@ def reconcile_automation_ids() -> dict[str, Any]:
     }
 
 
+_SYNC_DOMAIN_BY_KIND: dict[str, Callable[..., list[str]]] = {
+    "list": _sync_list_domain,
+    "mapping": _sync_mapping_domain,
+    "lovelace": _sync_lovelace_domain,
+}
+_SYNCABLE_DOMAINS = tuple(spec for spec in YAML_MODULE_DOMAINS if spec.kind in _SYNC_DOMAIN_BY_KIND)
+
+
 def _sync_yaml_modules_state(
     state: dict[str, Any],
     warnings: list[str],
@@ -2442,42 +2749,24 @@ def _sync_yaml_modules_state(
     preference_override: str | None = None,
     write_mode: str = "all",
 ) -> list[str]:
+    """Sync every YAML Modules domain plus helpers, in domain order.
+
+    Runs serially in one loop rather than per-kind loops: domains can share files (a template
+    included from two domains writes one `.template.yaml.diff`), so the last writer must follow
+    `YAML_MODULE_DOMAINS` order, which interleaves kinds.
+    """
     changed_files: list[str] = []
-    for spec in YAML_MODULE_DOMAINS:
-        if spec.kind == "list":
-            changed_files.extend(
-                _sync_list_domain(
-                    spec,
-                    state,
-                    warnings,
-                    preview=preview,
-                    preference_override=preference_override,
-                    write_mode=write_mode,
-                )
-            )
-        elif spec.kind == "mapping":
-            changed_files.extend(
-                _sync_mapping_domain(
-                    spec,
-                    state,
-                    warnings,
-                    preview=preview,
-                    preference_override=preference_override,
-                    write_mode=write_mode,
-                )
-            )
-        elif spec.kind == "lovelace":
-            changed_files.extend(
-                _sync_lovelace_domain(
-                    spec,
-                    state,
-                    warnings,
-                    preview=preview,
-                    preference_override=preference_override,
-                    write_mode=write_mode,
-                )
+    for spec in _SYNCABLE_DOMAINS:
+        changed_files.extend(
+            _SYNC_DOMAIN_BY_KIND[spec.kind](
+                spec,
+                state,
+                warnings,
+                preview=preview,
+                preference_override=preference_override,
+                write_mode=write_mode,
             )
-
+        )
     changed_files.extend(
         _sync_helpers(
             state,
@@ -2509,12 +2798,12 @@ def _update_storage_lovelace_dashboards(
     if dashboards is not None:
         data = dashboards.get("data")
         if not isinstance(data, dict):
-            warnings.append(f"{dashboards_path.relative_to(settings.CONFIG_DIR)} data is not a map.")
+            warnings.append(f"{_rel_posix(dashboards_path)} data is not a map.")
         else:
             items = data.get("items") or []
             if not isinstance(items, list):
                 warnings.append(
-                    f"{dashboards_path.relative_to(settings.CONFIG_DIR)} items is not a list."
+                    f"{_rel_posix(dashboards_path)} items is not a list."
                 )
             else:
                 for entry in items:
@@ -2530,7 +2819,7 @@ def _update_storage_lovelace_dashboards(
                     if "/" in dashboard_id or "\\" in dashboard_id:
                         warnings.append(
                             f"Invalid lovelace dashboard id {dashboard_id!r} in "
-                            f"{dashboards_path.relative_to(settings.CONFIG_DIR)}."
+                            f"{_rel_posix(dashboards_path)}."
                         )
                         continue
                     dashboard_ids.append(dashboard_id)
@@ -2545,7 +2834,7 @@ def _update_storage_lovelace_dashboards(
             if "/" in dashboard_id or "\\" in dashboard_id:
                 warnings.append(
                     f"Invalid lovelace dashboard id {dashboard_id!r} from "
-                    f"{path.relative_to(settings.CONFIG_DIR)}."
+                    f"{_rel_posix(path)}."
                 )
                 continue
             dashboard_ids.append(dashboard_id)
@@ -2566,9 +2855,7 @@ def _update_storage_lovelace_dashboards(
     expected_paths: set[str] = set()
     if prune_stale:
         expected_paths = {
-            (unassigned_dir / f"lovelace.{dashboard_id}.unassigned.yaml")
-            .relative_to(settings.CONFIG_DIR)
-            .as_posix()
+            _rel_posix(unassigned_dir / f"lovelace.{dashboard_id}.unassigned.yaml")
             for dashboard_id in dashboard_ids
         }
 
@@ -2577,13 +2864,13 @@ def _update_storage_lovelace_dashboards(
         payload = _load_storage_json(dashboard_path, warnings)
         if payload is None:
             warnings.append(
-                f"Missing {dashboard_path.relative_to(settings.CONFIG_DIR)} for dashboard "
+                f"Missing {_rel_posix(dashboard_path)} for dashboard "
                 f"{dashboard_id}."
             )
             continue
         storage_data = payload.get("data")
         if not isinstance(storage_data, dict):
-            warnings.append(f"{dashboard_path.relative_to(settings.CONFIG_DIR)} data is not a map.")
+            warnings.append(f"{_rel_posix(dashboard_path)} data is not a map.")
             continue
         config = storage_data.get("config")
         if config is None:
@@ -2594,18 +2881,18 @@ def _update_storage_lovelace_dashboards(
             config_payload = config
         else:
             warnings.append(
-                f"{dashboard_path.relative_to(settings.CONFIG_DIR)} config is not a map."
+                f"{_rel_posix(dashboard_path)} config is not a map."
             )
             continue
 
         dest_path = unassigned_dir / f"lovelace.{dashboard_id}.unassigned.yaml"
-        rel_dest = dest_path.relative_to(settings.CONFIG_DIR).as_posix()
+        rel_dest = _rel_posix(dest_path)
         if _write_yaml(dest_path, config_payload, preview=None):
             changed_files.append(rel_dest)
 
     if prune_stale:
         for path in sorted(unassigned_dir.glob("lovelace.*.unassigned.y*ml")):
-            rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+            rel_path = _rel_posix(path)
             dashboard_id = _parse_lovelace_dashboard_id_from_unassigned_filename(path.name)
             if not dashboard_id:
                 continue
@@ -2621,12 +2908,12 @@ def _load_lovelace_storage_dashboard_config(path: Path, warnings: list[str]) ->
         warnings.append(error)
         return None
     if data is None:
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is empty.")
+        warnings.append(f"{_rel_posix(path)} is empty.")
         return None
     if isinstance(data, list):
         data = {"views": data}
     if not isinstance(data, dict):
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a YAML map.")
+        warnings.append(f"{_rel_posix(path)} is not a YAML map.")
         return None
     expanded = expand_includes(
         data,
@@ -2637,16 +2924,16 @@ def _load_lovelace_storage_dashboard_config(path: Path, warnings: list[str]) ->
         resolve_ha_includes=True,
     )
     if expanded is SKIP:
-        warnings.append(f"Skipping {path.relative_to(settings.CONFIG_DIR)} due to include expansion.")
+        warnings.append(f"Skipping {_rel_posix(path)} due to include expansion.")
         return None
     if isinstance(expanded, list):
         expanded = {"views": expanded}
     if not isinstance(expanded, dict):
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} expanded to a non-map payload.")
+        warnings.append(f"{_rel_posix(path)} expanded to a non-map payload.")
         return None
     if _contains_tagged_values(expanded):
         warnings.append(
-            f"{path.relative_to(settings.CONFIG_DIR)} contains YAML tags that cannot be written into "
+            f"{_rel_posix(path)} contains YAML tags that cannot be written into "
             ".storage JSON."
         )
         return None
@@ -2673,11 +2960,11 @@ def _build_storage_lovelace_dashboards(
         return
     data = dashboards.get("data")
     if not isinstance(data, dict):
-        warnings.append(f"{dashboards_path.relative_to(settings.CONFIG_DIR)} data is not a map.")
+        warnings.append(f"{_rel_posix(dashboards_path)} data is not a map.")
         return
     items = data.get("items") or []
     if not isinstance(items, list):
-        warnings.append(f"{dashboards_path.relative_to(settings.CONFIG_DIR)} items is not a list.")
+        warnings.append(f"{_rel_posix(dashboards_path)} items is not a list.")
         return
 
     dashboard_ids: list[str] = []
@@ -2694,7 +2981,7 @@ def _build_storage_lovelace_dashboards(
         if "/" in dashboard_id or "\\" in dashboard_id:
             warnings.append(
                 f"Invalid lovelace dashboard id {dashboard_id!r} in "
-                f"{dashboards_path.relative_to(settings.CONFIG_DIR)}."
+                f"{_rel_posix(dashboards_path)}."
             )
             continue
         dashboard_ids.append(dashboard_id)
@@ -2718,8 +3005,8 @@ def _build_storage_lovelace_dashboards(
                     continue
                 if dashboard_id not in dashboard_id_set:
                     warnings.append(
-                        f"{path.relative_to(settings.CONFIG_DIR)} dashboard id {dashboard_id} is not "
-                        f"present in {dashboards_path.relative_to(settings.CONFIG_DIR)}; skipping."
+                        f"{_rel_posix(path)} dashboard id {dashboard_id} is not "
+                        f"present in {_rel_posix(dashboards_path)}; skipping."
                     )
                     continue
                 if dashboard_id in chosen_by_id:
@@ -2732,11 +3019,11 @@ def _build_storage_lovelace_dashboards(
         if not chosen:
             continue
         skipped = ", ".join(
-            dup.relative_to(settings.CONFIG_DIR).as_posix() for dup in sorted(duplicates)
+            _rel_posix(dup) for dup in sorted(duplicates)
         )
         warnings.append(
             f"Duplicate lovelace dashboard {dashboard_id} definitions; keeping "
-            f"{chosen.relative_to(settings.CONFIG_DIR).as_posix()}, skipping: {skipped}."
+            f"{_rel_posix(chosen)}, skipping: {skipped}."
         )
 
     unassigned_dir = settings.PACKAGES_DIR / "unassigned"
@@ -2778,7 +3065,7 @@ def _build_storage_lovelace_dashboards(
             "data": data_payload,
         }
         if _write_storage_json_if_changed(storage_path, payload):
-            changed_files.append(storage_path.relative_to(settings.CONFIG_DIR).as_posix())
+            changed_files.append(_rel_posix(storage_path))
 
 
 def sync_yaml_modules() -> dict[str, Any]:
@@ -2869,44 +3156,43 @@ def update_yaml_modules() -> dict[str, Any]:
     }
 
 
-def _domain_yaml_paths() -> set[str]:
-    paths = {
-        spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix()
-        for spec in YAML_MODULE_DOMAINS
-    }
-    paths.update(f"{helper}.yaml" for helper in HELPER_TYPES)
-    return paths
+_PREVIEW_PATH_RE = re.compile(r"(?!\.gitops/|system/).*\.(?:ya?ml|diff)", re.DOTALL)
 
 
 def _is_preview_path(rel_path: str) -> bool:
-    if rel_path.startswith(".gitops/"):
-        return False
-    if rel_path.startswith("system/"):
-        return False
-    return rel_path.endswith((".yaml", ".yml", ".diff"))
+    return _PREVIEW_PATH_RE.fullmatch(rel_path) is not None
 
 
 def _build_preview_diff(rel_path: str, new_content: str) -> str:
     old_content = read_text(settings.CONFIG_DIR / rel_path)
-    old_lines = old_content.splitlines()
-    new_lines = new_content.splitlines()
-    diff_lines = list(
-        difflib.unified_diff(
-            old_lines,
-            new_lines,
-            fromfile=f"a/{rel_path}",
-            tofile=f"b/{rel_path}",
-            lineterm="",
-        )
-    )
-    if not diff_lines:
-        return ""
-    diff_text = "\n".join(diff_lines)
-    return f"diff --git a/{rel_path} b/{rel_path}\n{diff_text}\n"
+    return _unified_diff_text(rel_path, old_content, new_content)
+
+
+# Signature of the YAML files under the config dir and the preview computed from them.
+_PREVIEW_CACHE: tuple[bytes, dict[str, Any]] | None = None
 
 
 def preview_yaml_modules() -> dict[str, Any]:
-    """Return diffs for a YAML Modules sync without writing files."""
+    """Return diffs for a YAML Modules sync without writing files.
+
+    The response is reused while no YAML file under the config dir changed size or mtime, and is
+    not cached while any of them was modified too recently for its mtime to be trusted.
+    """
+    global _PREVIEW_CACHE
+    signature = yaml_tree_signature(settings.CONFIG_DIR)
+    if (
+        not settings.FORCE_FULL_SYNC
+        and signature is not None
+        and _PREVIEW_CACHE is not None
+        and _PREVIEW_CACHE[0] == signature
+    ):
+        return copy.deepcopy(_PREVIEW_CACHE[1])
+    result = _compute_yaml_modules_preview()
+    _PREVIEW_CACHE = (signature, copy.deepcopy(result)) if signature is not None else None
+    return result
+
+
+def _compute_yaml_modules_preview() -> dict[str, Any]:
     warnings: list[str] = []
     preview_writes: dict[str, str] = {}
     if _needs_automation_marker_migration():
@@ -2917,7 +3203,7 @@ def preview_yaml_modules() -> dict[str, Any]:
     warnings.extend(state_warnings)
     _sync_yaml_modules_state(state, warnings, preview=preview_writes)
 
-    domain_paths = _domain_yaml_paths()
+    domain_paths = _DOMAIN_YAML_PATHS
     build_diffs: list[dict[str, Any]] = []
     update_diffs: list[dict[str, Any]] = []
     for rel_path, new_content in preview_writes.items():
@@ -2968,14 +3254,7 @@ def _plan_yaml_modules(
 
 
 def _dedupe_lines(values: list[str]) -> list[str]:
-    seen: set[str] = set()
-    output: list[str] = []
-    for value in values:
-        if value in seen:
-            continue
-        seen.add(value)
-        output.append(value)
-    return output
+    return list(dict.fromkeys(values))
 
 
 def validate_yaml_modules() -> dict[str, Any]:
@@ -2997,33 +3276,18 @@ def validate_yaml_modules() -> dict[str, Any]:
         domain_warnings: list[str] = []
         domain_errors: list[str] = []
         preview: dict[str, str] = {}
+        sync_fn = _SYNC_DOMAIN_BY_KIND.get(spec.kind)
         try:
-            if spec.kind == "list":
-                changed_files = _sync_list_domain(
-                    spec,
-                    state,
-                    domain_warnings,
-                    preview=preview,
-                    write_mode="all",
-                )
-            elif spec.kind == "mapping":
-                changed_files = _sync_mapping_domain(
-                    spec,
-                    state,
-                    domain_warnings,
-                    preview=preview,
-                    write_mode="all",
-                )
-            elif spec.kind == "lovelace":
-                changed_files = _sync_lovelace_domain(
+            if sync_fn is None:
+                changed_files = []
+            else:
+                changed_files = sync_fn(
                     spec,
                     state,
                     domain_warnings,
                     preview=preview,
                     write_mode="all",
                 )
-            else:
-                changed_files = []
         except Exception as exc:
             domain_errors.append(str(exc))
             changed_files = []
@@ -3132,18 +3396,50 @@ def _parse_item_yaml(payload: str) -> Any:
         raise ValueError(f"Invalid YAML: {exc}") from exc
 
 
+ListItemIndex = tuple[dict[str, list[int]], dict[str, list[int]]]
+
+
+def _build_list_item_index(items: list[ModuleItem]) -> ListItemIndex:
+    """Index item positions by id and by fingerprint for repeated selector lookups."""
+    by_id: dict[str, list[int]] = {}
+    by_fingerprint: dict[str, list[int]] = {}
+    for idx, item in enumerate(items):
+        by_id.setdefault(item.ha_id, []).append(idx)
+        if item.fingerprint:
+            by_fingerprint.setdefault(item.fingerprint, []).append(idx)
+    return by_id, by_fingerprint
+
+
+def _indexed_positions(index: dict[str, list[int]], key: Any) -> list[int]:
+    if not isinstance(key, str):
+        return []
+    return index.get(key, [])
+
+
 def _select_list_item(
-    items: list[ModuleItem], selector: dict[str, Any]
+    items: list[ModuleItem],
+    selector: ResolvedSelector,
+    index: ListItemIndex | None = None,
 ) -> tuple[int, ModuleItem]:
-    target_id = selector.get("id")
-    target_fp = selector.get("fingerprint")
-    matches: list[tuple[int, ModuleItem]] = []
-    for idx, item in enumerate(items):
-        if target_id and item.ha_id != target_id:
-            continue
-        if target_fp and item.fingerprint != target_fp:
-            continue
-        matches.append((idx, item))
+    """Return the single item matching the selector's `id` and/or `fingerprint`.
+
+    Pass a prebuilt `index` when resolving several selectors against the same items.
+    Raises ValueError when no item or more than one item matches.
+    """
+    by_id, by_fingerprint = index if index is not None else _build_list_item_index(items)
+    target_id = selector.id
+    target_fp = selector.fingerprint
+    positions: Iterable[int]
+    if target_id and target_fp:
+        fp_positions = set(_indexed_positions(by_fingerprint, target_fp))
+        positions = [idx for idx in _indexed_positions(by_id, target_id) if idx in fp_positions]
+    elif target_id:
+        positions = _indexed_positions(by_id, target_id)
+    elif target_fp:
+        positions = _indexed_positions(by_fingerprint, target_fp)
+    else:
+        positions = range(len(items))
+    matches = [(idx, items[idx]) for idx in positions]
     if len(matches) == 1:
         return matches[0]
     if not matches:
@@ -3161,14 +3457,14 @@ def _list_items_from_helpers_file(
     if data is None:
         data = {}
     if not isinstance(data, dict):
-        warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} is not a map.")
+        warnings.append(f"{_rel_posix(path)} is not a map.")
         return []
     items: list[dict[str, Any]] = []
     for helper_type, helper_values in data.items():
         if helper_type not in HELPER_TYPES:
             continue
         if not isinstance(helper_values, dict):
-            warnings.append(f"{path.relative_to(settings.CONFIG_DIR)} {helper_type} is not a map.")
+            warnings.append(f"{_rel_posix(path)} {helper_type} is not a map.")
             continue
         for key, value in helper_values.items():
             name = _item_name(value)
@@ -3191,7 +3487,7 @@ def _list_items_from_helpers_file(
 
 def list_module_items(rel_path: str) -> dict[str, Any]:
     path = _resolve_module_path(rel_path)
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     warnings: list[str] = []
     kind, spec = _module_file_context(path)
 
@@ -3264,11 +3560,10 @@ def list_module_items(rel_path: str) -> dict[str, Any]:
     raise ValueError("Unsupported module file type.")
 
 
-def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
-    if not isinstance(selector, dict):
-        raise ValueError("Selector must be an object.")
+def read_module_item(rel_path: str, raw_selector: dict[str, Any]) -> dict[str, Any]:
+    selector = _resolve_selector(raw_selector)
     path = _resolve_module_path(rel_path)
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     kind, spec = _module_file_context(path)
 
     if kind == "list" and spec:
@@ -3279,8 +3574,8 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
         return {
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
-            "yaml": yaml_dump(item.data),
+            "selector": selector.raw,
+            "yaml": yaml_dump_fast(item.data),
         }
 
     if kind == "mapping" and spec:
@@ -3289,7 +3584,7 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
         )
         if not valid:
             raise ValueError("Module file is not a valid map.")
-        key = selector.get("key")
+        key = selector.key
         if not key:
             raise ValueError("Selector key is required.")
         if key not in data:
@@ -3298,8 +3593,8 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
         return {
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
-            "yaml": yaml_dump(value),
+            "selector": selector.raw,
+            "yaml": yaml_dump_fast(value),
         }
 
     if kind == "helpers":
@@ -3310,8 +3605,8 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
             data = {}
         if not isinstance(data, dict):
             raise ValueError("Module file is not a valid helpers map.")
-        helper_type = selector.get("helper_type")
-        key = selector.get("key")
+        helper_type = selector.helper_type
+        key = selector.key
         if not helper_type or not key:
             raise ValueError("Selector helper_type and key are required.")
         helper_values = data.get(helper_type)
@@ -3320,8 +3615,8 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
         return {
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
-            "yaml": yaml_dump(helper_values[key]),
+            "selector": selector.raw,
+            "yaml": yaml_dump_fast(helper_values[key]),
         }
 
     if kind == "lovelace":
@@ -3332,20 +3627,19 @@ def read_module_item(rel_path: str, selector: dict[str, Any]) -> dict[str, Any]:
         return {
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
-            "yaml": yaml_dump(item.data),
+            "selector": selector.raw,
+            "yaml": yaml_dump_fast(item.data),
         }
 
     raise ValueError("Unsupported module file type.")
 
 
-def write_module_item(rel_path: str, selector: dict[str, Any], content: str) -> dict[str, Any]:
-    if not isinstance(selector, dict):
-        raise ValueError("Selector must be an object.")
+def write_module_item(rel_path: str, raw_selector: dict[str, Any], content: str) -> dict[str, Any]:
+    selector = _resolve_selector(raw_selector)
     if not isinstance(content, str):
         raise ValueError("YAML content must be a string.")
     path = _resolve_module_path(rel_path)
-    rel_path = path.relative_to(settings.CONFIG_DIR).as_posix()
+    rel_path = _rel_posix(path)
     kind, spec = _module_file_context(path)
 
     item_data = _parse_item_yaml(content)
@@ -3362,8 +3656,7 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             data = []
         if not isinstance(data, list):
             raise ValueError("Module file is not a list.")
-        data_copy = copy.deepcopy(data)
-        items, _changed = _parse_list_items(data_copy, None, rel_path, spec, [])
+        items, _changed = _parse_list_items(data, None, rel_path, spec, [], mutate=False)
         index, _item = _select_list_item(items, selector)
         if spec.key == "automation" and spec.id_field:
             if not item_data.get(spec.id_field):
@@ -3379,7 +3672,7 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             "status": "saved",
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
+            "selector": selector.raw,
             "fingerprint": _fingerprint(item_data, {spec.id_field} if spec.id_field else set()),
         }
 
@@ -3393,7 +3686,7 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             data = {}
         if not isinstance(data, dict):
             raise ValueError("Module file is not a map.")
-        key = selector.get("key")
+        key = selector.key
         if not key:
             raise ValueError("Selector key is required.")
         if key not in data:
@@ -3404,7 +3697,7 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             "status": "saved",
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
+            "selector": selector.raw,
             "fingerprint": _fingerprint(item_data, set()),
         }
 
@@ -3418,8 +3711,8 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             data = {}
         if not isinstance(data, dict):
             raise ValueError("Module file is not a helpers map.")
-        helper_type = selector.get("helper_type")
-        key = selector.get("key")
+        helper_type = selector.helper_type
+        key = selector.key
         if not helper_type or not key:
             raise ValueError("Selector helper_type and key are required.")
         if helper_type not in HELPER_TYPES:
@@ -3438,7 +3731,7 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             "status": "saved",
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
+            "selector": selector.raw,
             "fingerprint": _fingerprint(item_data, set()),
         }
 
@@ -3450,56 +3743,71 @@ def write_module_item(rel_path: str, selector: dict[str, Any], content: str) ->
             raise ValueError(error)
         if data is None:
             data = []
-        shape = "list"
-        meta: dict[str, Any] = {}
-        views: list[Any]
-        if isinstance(data, list):
-            views = data
-        elif isinstance(data, dict):
-            shape = "dict"
-            views = data.get("views") or []
-            if not isinstance(views, list):
-                raise ValueError("Lovelace views are not a list.")
-            meta = {key: value for key, value in data.items() if key != "views"}
-        else:
-            raise ValueError("Module file is not a valid lovelace module.")
-        views_copy = copy.deepcopy(views)
-        items, _changed = _parse_list_items(views_copy, None, rel_path, spec, [])
+        shape, views, meta = _split_lovelace_payload(data)
+        items, _changed = _parse_list_items(views, None, rel_path, spec, [], mutate=False)
         index, _item = _select_list_item(items, selector)
         if spec and spec.id_field and not item_data.get(spec.id_field):
-            selector_id = selector.get("id")
+            selector_id = selector.id
             if selector_id:
                 item_data[spec.id_field] = selector_id
         views[index] = item_data
-        payload = views if shape == "list" else {"views": views, **meta}
+        payload = _join_lovelace_payload(shape, views, meta)
         _write_yaml(path, payload, preview=None)
         return {
             "status": "saved",
             "path": rel_path,
             "file_kind": kind,
-            "selector": selector,
+            "selector": selector.raw,
             "fingerprint": _fingerprint(item_data, {spec.id_field} if spec else set()),
         }
 
     raise ValueError("Unsupported module file type.")
 
 
-def _selector_key(selector: dict[str, Any]) -> str:
-    return json.dumps(selector, sort_keys=True)
+def _selector_key(selector: dict[str, Any]) -> Hashable:
+    """Return a hashable identity for a selector dict.
+
+    Selectors normally hold only strings, so a sorted item tuple is enough; selectors carrying
+    unhashable values fall back to canonical JSON.
+    """
+    key = tuple(sorted(selector.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return json.dumps(selector, sort_keys=True, separators=(",", ":"), default=str)
+    return key
+
+
+def _resolve_selector(raw: Any) -> ResolvedSelector:
+    if not isinstance(raw, dict):
+        raise ValueError("Selector must be an object.")
+    return ResolvedSelector(
+        raw=raw,
+        identity=_selector_key(raw),
+        id=raw.get("id"),
+        fingerprint=raw.get("fingerprint"),
+        key=raw.get("key"),
+        helper_type=raw.get("helper_type"),
+    )
 
 
 def _select_list_item_flexible(
-    items: list[ModuleItem], selector: dict[str, Any], allow_fingerprint_only: bool
+    items: list[ModuleItem],
+    selector: ResolvedSelector,
+    allow_fingerprint_only: bool,
+    index: ListItemIndex | None = None,
 ) -> tuple[int, ModuleItem]:
+    if index is None:
+        index = _build_list_item_index(items)
     try:
-        return _select_list_item(items, selector)
+        return _select_list_item(items, selector, index)
     except ValueError:
         if not allow_fingerprint_only:
             raise
-    fingerprint = selector.get("fingerprint")
+    fingerprint = selector.fingerprint
     if not fingerprint:
         raise ValueError("Item not found. Refresh the item list and try again.")
-    matches = [(idx, item) for idx, item in enumerate(items) if item.fingerprint == fingerprint]
+    matches = [(idx, items[idx]) for idx in _indexed_positions(index[1], fingerprint)]
     if len(matches) == 1:
         return matches[0]
     if not matches:
@@ -3510,7 +3818,7 @@ def _select_list_item_flexible(
 def _remove_list_items(
     path: Path,
     spec: DomainSpec,
-    selectors: list[dict[str, Any]],
+    selectors: list[ResolvedSelector],
     warnings: list[str],
     allow_fingerprint_only: bool,
 ) -> tuple[list[dict[str, Any]], list[Any]]:
@@ -3521,29 +3829,32 @@ def _remove_list_items(
         data = []
     if not isinstance(data, list):
         raise ValueError("Module file is not a list.")
-    data_copy = copy.deepcopy(data)
-    items, _changed = _parse_list_items(data_copy, None, path.relative_to(settings.CONFIG_DIR).as_posix(), spec, warnings)
-    removed: dict[str, dict[str, Any]] = {}
+    items, _changed = _parse_list_items(
+        data, None, _rel_posix(path), spec, warnings, mutate=False
+    )
+    item_index = _build_list_item_index(items)
+    removed: dict[Hashable, dict[str, Any]] = {}
     indices: list[int] = []
     for selector in selectors:
-        idx, item = _select_list_item_flexible(items, selector, allow_fingerprint_only)
-        key = _selector_key(selector)
-        removed[key] = {
+        idx, item = _select_list_item_flexible(
+            items, selector, allow_fingerprint_only, item_index
+        )
+        removed[selector.identity] = {
             "data": data[idx],
             "id": item.ha_id,
             "fingerprint": item.fingerprint,
             "name": item.name,
-            "selector": selector,
+            "selector": selector.raw,
         }
         indices.append(idx)
     for idx in sorted(set(indices), reverse=True):
         data.pop(idx)
-    ordered = [removed[_selector_key(selector)] for selector in selectors if _selector_key(selector) in removed]
+    ordered = [removed[selector.identity] for selector in selectors if selector.identity in removed]
     return ordered, data
 
 
 def _remove_mapping_items(
-    path: Path, selectors: list[dict[str, Any]]
+    path: Path, selectors: list[ResolvedSelector]
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
     data, _lines, error = yaml_load(path)
     if error:
@@ -3553,8 +3864,9 @@ def _remove_mapping_items(
     if not isinstance(data, dict):
         raise ValueError("Module file is not a map.")
     removed: list[dict[str, Any]] = []
+    keys_to_remove: list[Any] = []
     for selector in selectors:
-        key = selector.get("key")
+        key = selector.key
         if not key:
             raise ValueError("Selector key is required.")
         if key not in data:
@@ -3564,18 +3876,17 @@ def _remove_mapping_items(
                 "data": data[key],
                 "id": str(key),
                 "key": str(key),
-                "selector": selector,
+                "selector": selector.raw,
             }
         )
-    for selector in selectors:
-        key = selector.get("key")
-        if key in data:
-            data.pop(key)
+        keys_to_remove.append(key)
+    for key in keys_to_remove:
+        data.pop(key, None)
     return removed, data
 
 
 def _remove_helpers_items(
-    path: Path, selectors: list[dict[str, Any]]
+    path: Path, selectors: list[ResolvedSelector]
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
     data, _lines, error = yaml_load(path)
     if error:
@@ -3585,9 +3896,10 @@ def _remove_helpers_items(
     if not isinstance(data, dict):
         raise ValueError("Module file is not a helpers map.")
     removed: list[dict[str, Any]] = []
+    keys_to_remove: list[tuple[Any, Any]] = []
     for selector in selectors:
-        helper_type = selector.get("helper_type")
-        key = selector.get("key")
+        helper_type = selector.helper_type
+        key = selector.key
         if not helper_type or not key:
             raise ValueError("Selector helper_type and key are required.")
         helper_values = data.get(helper_type)
@@ -3599,12 +3911,11 @@ def _remove_helpers_items(
                 "id": str(key),
                 "key": str(key),
                 "helper_type": helper_type,
-                "selector": selector,
+                "selector": selector.raw,
             }
         )
-    for selector in selectors:
-        helper_type = selector.get("helper_type")
-        key = selector.get("key")
+        keys_to_remove.append((helper_type, key))
+    for helper_type, key in keys_to_remove:
         helper_values = data.get(helper_type)
         if isinstance(helper_values, dict) and key in helper_values:
             helper_values.pop(key)
@@ -3613,10 +3924,34 @@ def _remove_helpers_items(
     return removed, data
 
 
+def _split_lovelace_payload(
+    data: Any, *, invalid_message: str = "Module file is not a valid lovelace module."
+) -> tuple[str, list[Any], dict[str, Any]]:
+    """Split a lovelace module payload into (shape, views, top-level meta).
+
+    Raises ValueError for payloads that are neither a view list nor a map with a `views` list.
+    """
+    if isinstance(data, list):
+        return "list", data, {}
+    if not isinstance(data, dict):
+        raise ValueError(invalid_message)
+    views = data.get("views") or []
+    if not isinstance(views, list):
+        raise ValueError("Lovelace views are not a list.")
+    return "dict", views, {key: value for key, value in data.items() if key != "views"}
+
+
+def _join_lovelace_payload(shape: str, views: list[Any], meta: dict[str, Any]) -> Any:
+    """Inverse of `_split_lovelace_payload`; dict payloads always lead with `views`."""
+    if shape == "list":
+        return views
+    return {"views": views, **meta}
+
+
 def _remove_lovelace_items(
     path: Path,
     spec: DomainSpec,
-    selectors: list[dict[str, Any]],
+    selectors: list[ResolvedSelector],
     warnings: list[str],
     allow_fingerprint_only: bool,
 ) -> tuple[list[dict[str, Any]], Any]:
@@ -3625,38 +3960,29 @@ def _remove_lovelace_items(
         raise ValueError(error)
     if data is None:
         data = []
-    shape = "list"
-    meta: dict[str, Any] = {}
-    views: list[Any]
-    if isinstance(data, list):
-        views = data
-    elif isinstance(data, dict):
-        shape = "dict"
-        views = data.get("views") or []
-        if not isinstance(views, list):
-            raise ValueError("Lovelace views are not a list.")
-        meta = {key: value for key, value in data.items() if key != "views"}
-    else:
-        raise ValueError("Module file is not a valid lovelace module.")
-    views_copy = copy.deepcopy(views)
-    items, _changed = _parse_list_items(views_copy, None, path.relative_to(settings.CONFIG_DIR).as_posix(), spec, warnings)
-    removed: dict[str, dict[str, Any]] = {}
+    shape, views, meta = _split_lovelace_payload(data)
+    items, _changed = _parse_list_items(
+        views, None, _rel_posix(path), spec, warnings, mutate=False
+    )
+    item_index = _build_list_item_index(items)
+    removed: dict[Hashable, dict[str, Any]] = {}
     indices: list[int] = []
     for selector in selectors:
-        idx, item = _select_list_item_flexible(items, selector, allow_fingerprint_only)
-        key = _selector_key(selector)
-        removed[key] = {
+        idx, item = _select_list_item_flexible(
+            items, selector, allow_fingerprint_only, item_index
+        )
+        removed[selector.identity] = {
             "data": views[idx],
             "id": item.ha_id,
             "fingerprint": item.fingerprint,
             "name": item.name,
-            "selector": selector,
+            "selector": selector.raw,
         }
         indices.append(idx)
     for idx in sorted(set(indices), reverse=True):
         views.pop(idx)
-    payload = views if shape == "list" else {"views": views, **meta}
-    ordered = [removed[_selector_key(selector)] for selector in selectors if _selector_key(selector) in removed]
+    payload = _join_lovelace_payload(shape, views, meta)
+    ordered = [removed[selector.identity] for selector in selectors if selector.identity in removed]
     return ordered, payload
 
 
@@ -3682,12 +4008,23 @@ def _prepare_list_item_for_target(
                     candidate = _sanitize_lovelace_path(candidate)
             fingerprint = _fingerprint(item_data, {spec.id_field})
             item_id = _ensure_unique_id(candidate, used_ids, fingerprint)
-            item_data[spec.id_field] = item_id
+            # Copy on write so the caller's removed-item data is left untouched.
+            item_data = {**item_data, spec.id_field: item_id}
         if item_id:
             used_ids.add(str(item_id))
     return item_data
 
 
+def _existing_item_ids(entries: list[Any], id_field: str | None) -> set[str]:
+    if not id_field:
+        return set()
+    return {
+        str(entry[id_field])
+        for entry in entries
+        if isinstance(entry, dict) and entry.get(id_field) is not None
+    }
+
+
 def _append_items_to_list_file(
     path: Path,
     spec: DomainSpec,
@@ -3700,15 +4037,11 @@ def _append_items_to_list_file(
         data = []
     if not isinstance(data, list):
         raise ValueError("Destination file is not a list.")
-    used_ids: set[str] = set()
-    if spec.id_field:
-        for entry in data:
-            if isinstance(entry, dict) and entry.get(spec.id_field) is not None:
-                used_ids.add(str(entry.get(spec.id_field)))
+    used_ids = _existing_item_ids(data, spec.id_field)
+    rel_path = _rel_posix(path)
     for idx, item in enumerate(items):
-        payload = dict(item["data"])
         payload = _prepare_list_item_for_target(
-            payload, spec, used_ids, path.relative_to(settings.CONFIG_DIR).as_posix(), len(data) + idx
+            item["data"], spec, used_ids, rel_path, len(data) + idx
         )
         data.append(payload)
     _write_yaml(path, data, preview=None)
@@ -3764,31 +4097,17 @@ def _append_items_to_lovelace_file(
         raise ValueError(error)
     if data is None:
         data = []
-    shape = "list"
-    meta: dict[str, Any] = {}
-    views: list[Any]
-    if isinstance(data, list):
-        views = data
-    elif isinstance(data, dict):
-        shape = "dict"
-        views = data.get("views") or []
-        if not isinstance(views, list):
-            raise ValueError("Lovelace views are not a list.")
-        meta = {key: value for key, value in data.items() if key != "views"}
-    else:
-        raise ValueError("Destination file is not a valid lovelace module.")
-    used_ids: set[str] = set()
-    if spec.id_field:
-        for entry in views:
-            if isinstance(entry, dict) and entry.get(spec.id_field) is not None:
-                used_ids.add(str(entry.get(spec.id_field)))
+    shape, views, meta = _split_lovelace_payload(
+        data, invalid_message="Destination file is not a valid lovelace module."
+    )
+    used_ids = _existing_item_ids(views, spec.id_field)
+    rel_path = _rel_posix(path)
     for idx, item in enumerate(items):
-        payload = dict(item["data"])
         payload = _prepare_list_item_for_target(
-            payload, spec, used_ids, path.relative_to(settings.CONFIG_DIR).as_posix(), len(views) + idx
+            item["data"], spec, used_ids, rel_path, len(views) + idx
         )
         views.append(payload)
-    final_payload = views if shape == "list" else {"views": views, **meta}
+    final_payload = _join_lovelace_payload(shape, views, meta)
     _write_yaml(path, final_payload, preview=None)
 
 
@@ -3866,26 +4185,29 @@ def operate_module_items(
 
     warnings: list[str] = []
     changed_files: list[str] = []
-    items_by_source: dict[str, list[dict[str, Any]]] = {}
-    ordered_items: list[tuple[str, dict[str, Any]]] = []
+    items_by_source: dict[str, list[ResolvedSelector]] = {}
+    ordered_items: list[tuple[str, ResolvedSelector]] = []
     for entry in items:
         if not isinstance(entry, dict):
             raise ValueError("Each item must be an object.")
         path = entry.get("path")
-        selector = entry.get("selector")
+        raw_selector = entry.get("selector")
         if not isinstance(path, str) or not path:
             raise ValueError("Item path is required.")
-        if not isinstance(selector, dict):
+        if not isinstance(raw_selector, dict):
             raise ValueError("Item selector is required.")
+        selector = _resolve_selector(raw_selector)
         items_by_source.setdefault(path, []).append(selector)
         ordered_items.append((path, selector))
 
-    removed_items_by_source: dict[str, list[dict[str, Any]]] = {}
+    removed_by_source_key: dict[str, dict[Hashable, dict[str, Any]]] = {}
     source_context: dict[str, tuple[str, DomainSpec | None]] = {}
+    source_paths: dict[str, Path] = {}
     for rel_path, selectors in items_by_source.items():
         path = _resolve_module_path(rel_path)
         kind, spec = _module_file_context(path)
         source_context[rel_path] = (kind, spec)
+        source_paths[rel_path] = path
         if kind == "list" and spec:
             removed_items, updated = _remove_list_items(
                 path, spec, selectors, warnings, allow_fingerprint_only=False
@@ -3902,67 +4224,79 @@ def operate_module_items(
             raise ValueError("Unsupported module file type.")
 
         _write_yaml(path, updated, preview=None)
-        changed_files.append(path.relative_to(settings.CONFIG_DIR).as_posix())
-        removed_items_by_source[rel_path] = removed_items
+        changed_files.append(_rel_posix(path))
+        # The removal helpers return one entry per selector, in selector order.
+        removed_by_source_key[rel_path] = {
+            selector.identity: item
+            for selector, item in zip(selectors, removed_items, strict=True)
+        }
 
     if operation == "delete":
+        # Stage selectors per domain file so each one is loaded and written once, even when
+        # several source files feed the same domain.
+        selectors_by_domain: dict[str, tuple[str, DomainSpec, list[ResolvedSelector]]] = {}
+        helper_keys_by_type: dict[str, list[Any]] = {}
         for rel_path, selectors in items_by_source.items():
             kind, spec = source_context[rel_path]
-            if kind == "list" and spec:
-                domain_items, domain_updated = _remove_list_items(
+            if kind == "helpers":
+                for selector in selectors:
+                    if selector.helper_type and selector.key:
+                        helper_keys_by_type.setdefault(selector.helper_type, []).append(
+                            selector.key
+                        )
+            elif spec and kind in {"list", "mapping", "lovelace"}:
+                selectors_by_domain.setdefault(spec.key, (kind, spec, []))[2].extend(selectors)
+
+        for kind, spec, selectors in selectors_by_domain.values():
+            if kind == "list":
+                _removed, domain_updated = _remove_list_items(
                     spec.domain_file, spec, selectors, warnings, allow_fingerprint_only=True
                 )
-                _ = domain_items
-                _write_domain_yaml(spec.domain_file, domain_updated, preview=None)
-                changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
-            elif kind == "mapping" and spec:
+            elif kind == "mapping":
                 _removed, domain_updated = _remove_mapping_items(spec.domain_file, selectors)
-                _write_domain_yaml(spec.domain_file, domain_updated, preview=None)
-                changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
-            elif kind == "lovelace" and spec:
+            else:
                 _removed, domain_updated = _remove_lovelace_items(
                     spec.domain_file, spec, selectors, warnings, allow_fingerprint_only=True
                 )
-                _write_domain_yaml(spec.domain_file, domain_updated, preview=None)
-                changed_files.append(spec.domain_file.relative_to(settings.CONFIG_DIR).as_posix())
-            elif kind == "helpers":
-                for selector in selectors:
-                    helper_type = selector.get("helper_type")
-                    key = selector.get("key")
-                    if not helper_type or not key:
-                        continue
-                    domain_path = settings.CONFIG_DIR / f"{helper_type}.yaml"
-                    data, _lines, error = yaml_load(domain_path)
-                    if error:
-                        warnings.append(error)
-                        continue
-                    if data is None:
-                        data = {}
-                    if not isinstance(data, dict):
-                        warnings.append(
-                            f"{domain_path.relative_to(settings.CONFIG_DIR)} is not a map."
-                        )
-                        continue
-                    if key in data:
-                        data.pop(key)
-                        _write_yaml(domain_path, data, preview=None)
-                        changed_files.append(
-                            domain_path.relative_to(settings.CONFIG_DIR).as_posix()
-                        )
+            _write_domain_yaml(spec.domain_file, domain_updated, preview=None)
+            changed_files.append(_rel_posix(spec.domain_file))
+
+        for helper_type, keys in helper_keys_by_type.items():
+            domain_path = settings.CONFIG_DIR / f"{helper_type}.yaml"
+            data, _lines, error = yaml_load(domain_path)
+            if error:
+                warnings.append(error)
+                continue
+            if data is None:
+                data = {}
+            if not isinstance(data, dict):
+                warnings.append(f"{_rel_posix(domain_path)} is not a map.")
+                continue
+            removed_any = False
+            for key in keys:
+                if key in data:
+                    data.pop(key)
+                    removed_any = True
+            if removed_any:
+                _write_yaml(domain_path, data, preview=None)
+                changed_files.append(_rel_posix(domain_path))
 
     if operation in {"move", "unassign"}:
         items_by_destination: dict[str, dict[str, Any]] = {}
+        destination_by_source: dict[str, str] = {}
         for rel_path, _selectors in items_by_source.items():
             kind, spec = source_context[rel_path]
-            source_path = _resolve_module_path(rel_path)
+            source_path = source_paths[rel_path]
             destination = _resolve_destination_path(
                 operation, source_path, kind, spec, move_target
             )
             if destination is None:
                 continue
-            if destination.resolve() == source_path.resolve():
+            # source_path is already resolved by _resolve_module_path.
+            if destination == source_path or destination.resolve() == source_path:
                 raise ValueError("Destination matches the source file.")
-            dest_key = destination.relative_to(settings.CONFIG_DIR).as_posix()
+            dest_key = _rel_posix(destination)
+            destination_by_source[rel_path] = dest_key
             if dest_key not in items_by_destination:
                 items_by_destination[dest_key] = {"kind": kind, "spec": spec, "items": []}
             else:
@@ -3970,21 +4304,11 @@ def operate_module_items(
                 if existing["kind"] != kind or existing["spec"] != spec:
                     raise ValueError("Destination cannot mix different module types.")
 
-        removed_by_source_key: dict[str, dict[str, dict[str, Any]]] = {}
-        for rel_path, removed_items in removed_items_by_source.items():
-            removed_by_source_key[rel_path] = {
-                _selector_key(item["selector"]): item for item in removed_items if item.get("selector")
-            }
         for rel_path, selector in ordered_items:
-            kind, spec = source_context[rel_path]
-            source_path = _resolve_module_path(rel_path)
-            destination = _resolve_destination_path(
-                operation, source_path, kind, spec, move_target
-            )
-            if destination is None:
+            dest_key = destination_by_source.get(rel_path)
+            if dest_key is None:
                 continue
-            dest_key = destination.relative_to(settings.CONFIG_DIR).as_posix()
-            removed_item = removed_by_source_key.get(rel_path, {}).get(_selector_key(selector))
+            removed_item = removed_by_source_key.get(rel_path, {}).get(selector.identity)
             if not removed_item:
                 raise ValueError("Selected item could not be resolved after removal.")
             items_by_destination[dest_key]["items"].append(removed_item)
@@ -4010,7 +4334,7 @@ def operate_module_items(
 
     sync_result = sync_yaml_modules()
     warnings.extend(sync_result.get("warnings", []))
-    changed_files = sorted(set(changed_files + sync_result.get("changed_files", [])))
+    changed_files = sorted({*changed_files, *sync_result.get("changed_files", ())})
     return {
         "status": "ok",
         "changed_files": changed_files,
@@ -4019,21 +4343,16 @@ def operate_module_items(
 
 
 def _spec_by_key(key: str) -> DomainSpec | None:
-    for spec in YAML_MODULE_DOMAINS:
-        if spec.key == key:
-            return spec
-    return None
+    return _DOMAINS_BY_KEY.get(key)
 
 
 def _spec_by_package_filename(filename: str) -> DomainSpec | None:
-    for spec in YAML_MODULE_DOMAINS:
-        if spec.package_filename == filename:
-            return spec
-    return None
+    return _DOMAINS_BY_PACKAGE_FILENAME.get(filename)
 
 
 def _module_file_context(path: Path) -> tuple[str, DomainSpec | None]:
-    rel_parts = path.relative_to(settings.CONFIG_DIR).parts
+    rel_path = _rel_posix(path)
+    rel_parts = rel_path.split("/") if rel_path != "." else []
     if not rel_parts:
         raise ValueError("Module path is not within the config directory.")
     root = rel_parts[0]
@@ -4072,14 +4391,12 @@ def _module_file_context(path: Path) -> tuple[str, DomainSpec | None]:
 def list_yaml_modules_index() -> dict[str, Any]:
     modules: dict[str, dict[str, Any]] = {}
     packages_dir = settings.PACKAGES_DIR
+    unassigned_dir = packages_dir / "unassigned"
     if packages_dir.exists():
-        for file_path in sorted(packages_dir.rglob("*")):
-            if not file_path.is_file():
-                continue
-            if not _is_yaml_path(file_path):
-                continue
-            rel_path = file_path.relative_to(settings.CONFIG_DIR)
-            parts = rel_path.parts
+        # unassigned/ is indexed separately below, so the package walk skips it.
+        for file_path in sorted(list_yaml_files(packages_dir, exclude_dirs=[unassigned_dir])):
+            rel_path = _rel_posix(file_path)
+            parts = rel_path.split("/")
             if len(parts) < 2:
                 continue
             package_name = Path(parts[1]).stem if len(parts) == 2 else parts[1]
@@ -4094,7 +4411,7 @@ def list_yaml_modules_index() -> dict[str, Any]:
                     "files": [],
                 },
             )
-            module["files"].append(rel_path.as_posix())
+            module["files"].append(rel_path)
 
     package_modules = list(modules.values())
     for module in package_modules:
@@ -4103,13 +4420,8 @@ def list_yaml_modules_index() -> dict[str, Any]:
     one_off_modules: list[dict[str, Any]] = []
     unassigned_modules: list[dict[str, Any]] = []
     unassigned_files_by_domain: dict[str, list[str]] = {}
-    unassigned_dir = settings.PACKAGES_DIR / "unassigned"
     if unassigned_dir.exists():
-        for path in sorted(unassigned_dir.rglob("*")):
-            if not path.is_file():
-                continue
-            if not _is_yaml_path(path):
-                continue
+        for path in sorted(list_yaml_files(unassigned_dir)):
             domain = None
             if path.name == "helpers.yaml":
                 domain = "helpers"
@@ -4120,21 +4432,13 @@ def list_yaml_modules_index() -> dict[str, Any]:
                 elif _parse_lovelace_dashboard_id_from_unassigned_filename(path.name):
                     domain = "lovelace"
             if domain:
-                unassigned_files_by_domain.setdefault(domain, []).append(
-                    path.relative_to(settings.CONFIG_DIR).as_posix()
-                )
+                unassigned_files_by_domain.setdefault(domain, []).append(_rel_posix(path))
     for domain in MODULE_BROWSER_DOMAINS:
         dir_path = settings.CONFIG_DIR / domain
         files: list[str] = []
-        legacy_unassigned = _legacy_unassigned_module_path(dir_path).relative_to(
-            settings.CONFIG_DIR
-        ).as_posix()
+        legacy_unassigned = _rel_posix(_legacy_unassigned_module_path(dir_path))
         if dir_path.exists():
-            files = sorted(
-                path.relative_to(settings.CONFIG_DIR).as_posix()
-                for path in dir_path.rglob("*")
-                if path.is_file() and _is_yaml_path(path)
-            )
+            files = sorted(_rel_posix(path) for path in list_yaml_files(dir_path))
         canonical_unassigned_files = unassigned_files_by_domain.get(domain) or []
         primary_filename: str | None = None
         if domain == "helpers":
@@ -4187,9 +4491,9 @@ def read_module_file(rel_path: str) -> dict[str, Any]:
         raise FileNotFoundError("Module file not found.")
     content = read_text(path)
     return {
-        "path": path.relative_to(settings.CONFIG_DIR).as_posix(),
+        "path": _rel_posix(path),
         "content": content,
-        "hash": file_hash(path),
+        "hash": hash_text(content),
     }
 
 
@@ -4199,11 +4503,13 @@ def write_module_file(rel_path: str, content: str) -> dict[str, Any]:
     path = _resolve_module_path(rel_path)
     if not path.parent.exists():
         raise FileNotFoundError("Module directory not found.")
-    path.write_text(content, encoding="utf-8")
+    write_bytes_atomic(path, content.encode("utf-8"))
+    forget_yaml_load(path)
+    # read_module_file hashes text after universal newline translation; hash the same view.
     return {
         "status": "saved",
-        "path": path.relative_to(settings.CONFIG_DIR).as_posix(),
-        "hash": file_hash(path),
+        "path": _rel_posix(path),
+        "hash": hash_text(content.replace("\r\n", "\n").replace("\r", "\n")),
     }
 
 
@@ -4212,7 +4518,8 @@ def delete_module_file(rel_path: str) -> dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError("Module file not found.")
     path.unlink()
+    forget_yaml_load(path)
     return {
         "status": "deleted",
-        "path": path.relative_to(settings.CONFIG_DIR).as_posix(),
+        "path": _rel_posix(path),
     }
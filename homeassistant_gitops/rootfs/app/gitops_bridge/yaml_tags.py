@@ -1,13 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 import yaml
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TaggedValue:
     """Represents a YAML node with an explicit tag (e.g. `!include`, `!secret`, `!/path`)."""
 
@@ -16,40 +24,63 @@ class TaggedValue:
     line: int | None = None
 
 
-class GitopsYamlLoader(yaml.SafeLoader):
-    """Safe YAML loader that preserves `!` tags as TaggedValue objects."""
+class GitopsYamlLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """Safe YAML loader that preserves `!` tags as TaggedValue objects.
+
+    Parses with LibYAML when PyYAML was built against it and falls back to the pure-Python parser
+    otherwise; construction (tags, resolvers) is the same Python code either way.
+    """
 
 
 class GitopsYamlDumper(yaml.SafeDumper):
     """Safe YAML dumper that can emit TaggedValue objects."""
 
 
+# Node constructors by `node.id`; SafeConstructor's versions serve both the C and Python loaders.
+_TAGGED_NODE_CONSTRUCTORS = {
+    "scalar": yaml.constructor.SafeConstructor.construct_scalar,
+    "sequence": yaml.constructor.SafeConstructor.construct_sequence,
+    "mapping": yaml.constructor.SafeConstructor.construct_mapping,
+}
+
+
 def _construct_tagged(loader: GitopsYamlLoader, suffix: str, node: yaml.Node) -> TaggedValue:
-    tag = f"!{suffix}"
-    line = node.start_mark.line + 1 if getattr(node, "start_mark", None) else None
-    if isinstance(node, yaml.ScalarNode):
-        value: Any = loader.construct_scalar(node)
-    elif isinstance(node, yaml.SequenceNode):
-        value = loader.construct_sequence(node)
-    elif isinstance(node, yaml.MappingNode):
-        value = loader.construct_mapping(node)
-    else:
-        value = loader.construct_object(node)
+    # Interned so repeated tags share one string, which also keeps pickled include caches small.
+    tag = sys.intern(f"!{suffix}")
+    mark = node.start_mark
+    line = mark.line + 1 if mark is not None else None
+    construct = _TAGGED_NODE_CONSTRUCTORS.get(node.id)
+    value = construct(loader, node) if construct is not None else loader.construct_object(node)
     return TaggedValue(tag=tag, value=value, line=line)
 
 
 def _represent_tagged(dumper: GitopsYamlDumper, data: TaggedValue) -> yaml.Node:
     value = data.value
-    if isinstance(value, dict):
+    value_type = type(value)
+    # Exact-type checks first: almost every tagged value is a plain str, dict or list.
+    # Scalars ask for single quotes explicitly: the pure-Python emitter never writes tagged scalars
+    # plain, while LibYAML would, and both dumpers must render `!include 'foo.yaml'` the same way.
+    if value_type is str:
+        return dumper.represent_scalar(data.tag, value, style="'")
+    if value_type is dict or isinstance(value, dict):
         return dumper.represent_mapping(data.tag, value)
-    if isinstance(value, list):
+    if value_type is list or isinstance(value, list):
         return dumper.represent_sequence(data.tag, value)
     rendered = "" if value is None else str(value)
-    return dumper.represent_scalar(data.tag, rendered)
+    return dumper.represent_scalar(data.tag, rendered, style="'")
+
+
+class GitopsFastYamlDumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    """LibYAML-backed dumper for item editor responses.
+
+    Editor text is saved back through `write_module_item`, so tagged values are represented exactly
+    as GitopsYamlDumper writes them to disk.
+    """
 
 
 GitopsYamlLoader.add_multi_constructor("!", _construct_tagged)
 GitopsYamlDumper.add_representer(TaggedValue, _represent_tagged)
+GitopsFastYamlDumper.add_representer(TaggedValue, _represent_tagged)
 
 
 HA_INCLUDE_TAGS = {
@@ -63,43 +94,84 @@ HA_INCLUDE_TAGS = {
 SKIP = object()
 
 
+_GLOB_CHARS = frozenset("*?[]")
+_TEMPLATE_SUFFIXES = (".template.yaml", ".template.yml")
+
+
 def _has_glob(pattern: str) -> bool:
-    return any(char in pattern for char in "*?[]")
+    return not _GLOB_CHARS.isdisjoint(pattern)
 
 
 def _is_template_pattern(pattern: str) -> bool:
-    lowered = pattern.lower()
-    return lowered.endswith(".template.yaml") or lowered.endswith(".template.yml")
+    return pattern.endswith(_TEMPLATE_SUFFIXES) or pattern.lower().endswith(_TEMPLATE_SUFFIXES)
 
 
 def is_template_tag(tag: str) -> bool:
-    if not tag.startswith("!"):
-        return False
-    suffix = tag[1:].lstrip("/")
-    return bool(suffix) and _is_template_pattern(suffix)
+    """Return True for `!<path>.template.yaml` style tags (leading `/` optional, any case)."""
+    # The suffixes start with ".", so matching the raw tag equals matching it with "!/" stripped.
+    return tag.startswith("!") and _is_template_pattern(tag)
 
 
 def _normalize_config_relative(path: str) -> str:
     candidate = path.strip().lstrip("/")
     if not candidate:
         raise ValueError("Include path is empty.")
-    parts = Path(candidate).parts
-    if ".." in parts:
+    if ".." in candidate.split("/"):
         raise ValueError("Include path cannot include parent directory segments.")
     return candidate
 
 
-def _deep_merge(left: dict[str, Any], right: dict[str, Any]) -> dict[str, Any]:
-    merged = dict(left)
-    for key, value in right.items():
-        if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
-            merged[key] = _deep_merge(merged[key], value)
-            continue
-        if key in merged and isinstance(merged[key], list) and isinstance(value, list):
-            merged[key] = list(merged[key]) + list(value)
-            continue
-        merged[key] = value
-    return merged
+def _deep_merge_into(target: dict[str, Any], source: dict[str, Any]) -> None:
+    """Merge `source` into `target` in place: nested maps merge, lists concatenate.
+
+    Nested maps taken from `target` are copied before being merged into, so shared subtrees are
+    never mutated; values from `source` are referenced, not copied.
+    """
+    stack = [(target, source)]
+    while stack:
+        merged, right = stack.pop()
+        for key, value in right.items():
+            current = merged.get(key, SKIP)
+            if isinstance(current, dict) and isinstance(value, dict):
+                merged[key] = child = dict(current)
+                stack.append((child, value))
+            elif isinstance(current, list) and isinstance(value, list):
+                merged[key] = [*current, *value]
+            else:
+                merged[key] = value
+
+
+def _split_literal_prefix(pattern: str) -> tuple[str, str]:
+    """Split a glob pattern into its leading literal directories and the glob-bearing rest."""
+    parts = Path(pattern).parts
+    for index, part in enumerate(parts):
+        if _has_glob(part):
+            return "/".join(parts[:index]), "/".join(parts[index:])
+    return "/".join(parts[:-1]), parts[-1]
+
+
+@dataclass(frozen=True, slots=True)
+class _TemplateTag:
+    """Config-relative pattern parsed from a template tag, with its glob split when it has one."""
+
+    pattern: str
+    invalid_reason: str | None = None
+    is_template_path: bool = True
+    glob_split: tuple[str, str] | None = None
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_template_tag(tag: str) -> _TemplateTag:
+    # Pure string work, so it is cached per distinct tag; the filesystem is only touched by callers.
+    try:
+        pattern = _normalize_config_relative(tag[1:])
+    except ValueError as exc:
+        return _TemplateTag(pattern="", invalid_reason=str(exc))
+    if not _is_template_pattern(pattern):
+        return _TemplateTag(pattern=pattern, is_template_path=False)
+    if _has_glob(pattern):
+        return _TemplateTag(pattern=pattern, glob_split=_split_literal_prefix(pattern))
+    return _TemplateTag(pattern=pattern)
 
 
 def resolve_template_candidates(
@@ -113,21 +185,27 @@ def resolve_template_candidates(
 
     if not is_template_tag(tag):
         return []
-    try:
-        pattern = _normalize_config_relative(tag[1:])
-    except ValueError as exc:
-        warnings.append(f"Invalid template include path {tag} in {base_path.as_posix()}: {exc}")
+    parsed = _parse_template_tag(tag)
+    if parsed.invalid_reason is not None:
+        warnings.append(
+            f"Invalid template include path {tag} in {base_path.as_posix()}: {parsed.invalid_reason}"
+        )
         return []
-    if not _is_template_pattern(pattern):
+    if not parsed.is_template_path:
         warnings.append(
             f"Template include must reference *.template.yaml: {tag} in {base_path.as_posix()}"
         )
         return []
+    pattern = parsed.pattern
 
-    if _has_glob(pattern):
+    if parsed.glob_split is not None:
+        literal, tail = parsed.glob_split
+        search_root = config_dir / literal
+        if not search_root.is_dir():
+            return []
         candidates = [
             match
-            for match in sorted(config_dir.glob(pattern))
+            for match in sorted(search_root.glob(tail))
             if match.is_file() and _is_template_pattern(match.name)
         ]
         return candidates
@@ -146,19 +224,151 @@ def resolve_template_candidates(
     return []
 
 
+def _list_yaml_children(directory: Path) -> list[Path]:
+    """Return the `.yaml`/`.yml` files directly inside `directory`, sorted by name."""
+    with os.scandir(directory) as entries:
+        names = sorted(
+            entry.name
+            for entry in entries
+            if entry.name.endswith((".yaml", ".yml")) and entry.is_file()
+        )
+    return [directory / name for name in names]
+
+
+# Below this many files a thread pool costs more than it saves.
+_PARALLEL_LOAD_MIN_FILES = 5
+
+
+def _load_yaml_files(paths: list[Path], warnings: list[str]) -> list[Any]:
+    """Load several include files, parsing cache misses on a thread pool when there are many.
+
+    Cached files are served inline, so an unchanged directory never starts a pool. Results are in
+    `paths` order; each file's warnings are appended in that order as well.
+    """
+    loaded = [_cached_yaml_file(path) for path in paths]
+    misses = [index for index, data in enumerate(loaded) if data is _UNCACHED]
+    if len(misses) < _PARALLEL_LOAD_MIN_FILES:
+        for index in misses:
+            loaded[index] = _load_yaml_file(paths[index], warnings)
+        return loaded
+
+    def load(path: Path) -> tuple[Any, list[str]]:
+        file_warnings: list[str] = []
+        return _load_yaml_file(path, file_warnings), file_warnings
+
+    with ThreadPoolExecutor(max_workers=min(8, len(misses))) as executor:
+        results = list(executor.map(load, [paths[index] for index in misses]))
+    for index, (data, file_warnings) in zip(misses, results):
+        warnings.extend(file_warnings)
+        loaded[index] = data
+    return loaded
+
+
+# Parsed include/template files keyed by path and (size, mtime_ns); shared includes are parsed once.
+# Stored pickled so each hit is a fresh tree the expansion can mutate.
+_INCLUDE_CACHE_SIZE = 1000
+_INCLUDE_CACHE: OrderedDict[str, tuple[tuple[int, int], bytes]] = OrderedDict()
+_INCLUDE_CACHE_LOCK = threading.Lock()
+# A file modified this recently may still be rewritten within the same mtime tick at the same size,
+# so a (size, mtime_ns) key recorded now could later match different content (racy-git).
+_RACY_MTIME_WINDOW_NS = 1_000_000_000
+
+
+def mtime_is_racy(mtime_ns: int) -> bool:
+    """Return True when a file with this mtime is too fresh for a (size, mtime_ns) cache key."""
+    return time.time_ns() - mtime_ns < _RACY_MTIME_WINDOW_NS
+
+
+_UNCACHED = object()
+
+
+def _cached_include(key: str, stat_key: tuple[int, int]) -> Any:
+    with _INCLUDE_CACHE_LOCK:
+        cached = _INCLUDE_CACHE.get(key)
+        if cached is None or cached[0] != stat_key:
+            return _UNCACHED
+        _INCLUDE_CACHE.move_to_end(key)
+    return pickle.loads(cached[1])
+
+
+def _cached_yaml_file(path: Path) -> Any:
+    """Return the cached parse of `path`, or `_UNCACHED` when it has to be read."""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return _UNCACHED
+    return _cached_include(os.fspath(path), (stat_result.st_size, stat_result.st_mtime_ns))
+
+
 def _load_yaml_file(path: Path, warnings: list[str]) -> Any:
+    key = os.fspath(path)
     try:
-        text = path.read_text(encoding="utf-8")
+        stat_result = os.stat(key)
     except FileNotFoundError:
         warnings.append(f"Missing include file: {path.as_posix()}")
         return SKIP
-    if not text.strip():
+    stat_key = (stat_result.st_size, stat_result.st_mtime_ns)
+    cached = _cached_include(key, stat_key)
+    if cached is not _UNCACHED:
+        return cached
+
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        warnings.append(f"Missing include file: {path.as_posix()}")
+        return SKIP
+    if not raw.strip():
         return None
     try:
-        return yaml.load(text, Loader=GitopsYamlLoader)
+        # Bytes go straight to the parser's UTF-8 reader; invalid encodings surface as YAMLError.
+        data = yaml.load(raw, Loader=GitopsYamlLoader)
     except yaml.YAMLError as exc:
         warnings.append(f"Invalid YAML in {path.as_posix()}: {exc}")
         return SKIP
+    if mtime_is_racy(stat_result.st_mtime_ns):
+        return data
+    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    with _INCLUDE_CACHE_LOCK:
+        _INCLUDE_CACHE[key] = (stat_key, payload)
+        _INCLUDE_CACHE.move_to_end(key)
+        while len(_INCLUDE_CACHE) > _INCLUDE_CACHE_SIZE:
+            _INCLUDE_CACHE.popitem(last=False)
+    return data
+
+
+_MAX_INCLUDE_DEPTH = 20
+# Only these can contain tags; anything else is returned as-is, so loops copy it without recursing.
+_EXPANDABLE_TYPES = (dict, list, TaggedValue)
+
+
+@dataclass(frozen=True, slots=True)
+class _ExpandContext:
+    """Settings shared by every level of one `expand_includes` call."""
+
+    config_dir: Path
+    warnings: list[str]
+    resolve_templates: bool
+    resolve_ha_includes: bool
+    resolved_includes: dict[str, Path | None] = field(default_factory=dict)
+
+    def resolve_include(self, directory: Path, include_arg: str) -> Path | None:
+        """Resolve an include argument against `directory`; None when it leaves config_dir.
+
+        Memoized for the lifetime of this expansion, so an include referenced many times costs one
+        `resolve()`.
+        """
+        key = os.path.join(directory, include_arg)
+        try:
+            return self.resolved_includes[key]
+        except KeyError:
+            pass
+        include_path: Path | None = Path(key).resolve()
+        try:
+            include_path.relative_to(self.config_dir)
+        except ValueError:
+            include_path = None
+        self.resolved_includes[key] = include_path
+        return include_path
 
 
 def expand_includes(
@@ -178,121 +388,120 @@ def expand_includes(
       `!/packages/common.template.yaml` or `!packages/common.template.yaml`.
     - HA include tags are `!include*` tags with scalar string values.
     - Unknown tags are preserved as TaggedValue, with nested values expanded where applicable.
+    - With both resolve flags off nothing can change, so `value` itself is returned uncopied.
+    - Warnings added by this call are de-duplicated, so a file referenced from many places
+      (e.g. a missing include) is reported once.
     """
 
-    if _depth > 20:
-        warnings.append(f"Include expansion exceeded max depth at {base_path.as_posix()}.")
+    if not resolve_templates and not resolve_ha_includes:
+        return value
+    warnings_before = len(warnings)
+    expanded = _expand(
+        value,
+        _ExpandContext(
+            config_dir=config_dir,
+            warnings=warnings,
+            resolve_templates=resolve_templates,
+            resolve_ha_includes=resolve_ha_includes,
+        ),
+        base_path,
+        _depth,
+    )
+    if len(warnings) - warnings_before > 1:
+        warnings[warnings_before:] = dict.fromkeys(warnings[warnings_before:])
+    return expanded
+
+
+def _expand(value: Any, ctx: _ExpandContext, base_path: Path, depth: int) -> Any:
+    if depth > _MAX_INCLUDE_DEPTH:
+        ctx.warnings.append(f"Include expansion exceeded max depth at {base_path.as_posix()}.")
         return value
 
-    if value is SKIP:
-        return SKIP
+    # Scalars (and SKIP) pass through untouched; one check instead of falling through every branch.
+    if not isinstance(value, _EXPANDABLE_TYPES):
+        return value
 
     if isinstance(value, TaggedValue):
-        if resolve_templates and is_template_tag(value.tag):
+        if ctx.resolve_templates and is_template_tag(value.tag):
             candidates = resolve_template_candidates(
                 value.tag,
-                config_dir=config_dir,
+                config_dir=ctx.config_dir,
                 base_path=base_path,
-                warnings=warnings,
+                warnings=ctx.warnings,
             )
             if not candidates:
-                warnings.append(
+                ctx.warnings.append(
                     f"Template include did not match any files: {value.tag} in {base_path.as_posix()}"
                 )
                 return SKIP
             expanded: list[Any] = []
+            # list or dict while every child shares that shape, otherwise None.
+            shape: type | None = None
             for candidate in candidates:
-                loaded = _load_yaml_file(candidate, warnings)
-                expanded_child = expand_includes(
-                    loaded,
-                    config_dir=config_dir,
-                    base_path=candidate,
-                    warnings=warnings,
-                    resolve_templates=True,
-                    resolve_ha_includes=resolve_ha_includes,
-                    _depth=_depth + 1,
-                )
+                loaded = _load_yaml_file(candidate, ctx.warnings)
+                expanded_child = _expand(loaded, ctx, candidate, depth + 1)
                 if expanded_child is SKIP:
                     return SKIP
+                if isinstance(expanded_child, list):
+                    child_shape: type | None = list
+                elif isinstance(expanded_child, dict):
+                    child_shape = dict
+                else:
+                    child_shape = None
+                shape = child_shape if not expanded else (shape if shape is child_shape else None)
                 expanded.append(expanded_child)
             if len(expanded) == 1:
                 return expanded[0]
-            if all(isinstance(entry, list) for entry in expanded):
+            if shape is list:
                 merged_list: list[Any] = []
                 for entry in expanded:
-                    merged_list.extend(entry or [])
+                    merged_list.extend(entry)
                 return merged_list
-            if all(isinstance(entry, dict) for entry in expanded):
+            if shape is dict:
                 merged_map: dict[str, Any] = {}
                 for entry in expanded:
-                    merged_map = _deep_merge(merged_map, entry or {})
+                    _deep_merge_into(merged_map, entry)
                 return merged_map
-            warnings.append(
+            ctx.warnings.append(
                 f"Template glob include produced mixed shapes; skipping: {value.tag} in {base_path.as_posix()}"
             )
             return SKIP
 
-        if resolve_ha_includes and value.tag in HA_INCLUDE_TAGS:
+        if ctx.resolve_ha_includes and value.tag in HA_INCLUDE_TAGS:
             include_arg = value.value
             if not isinstance(include_arg, str) or not include_arg.strip():
-                warnings.append(f"{value.tag} must be a non-empty string in {base_path.as_posix()}")
+                ctx.warnings.append(f"{value.tag} must be a non-empty string in {base_path.as_posix()}")
                 return SKIP
-            include_path = (base_path.parent / include_arg).resolve()
-            try:
-                include_path.relative_to(config_dir)
-            except ValueError:
-                warnings.append(f"{value.tag} must stay within config dir in {base_path.as_posix()}")
+            include_path = ctx.resolve_include(base_path.parent, include_arg)
+            if include_path is None:
+                ctx.warnings.append(f"{value.tag} must stay within config dir in {base_path.as_posix()}")
                 return SKIP
 
             if value.tag == "!include":
-                loaded = _load_yaml_file(include_path, warnings)
-                return expand_includes(
-                    loaded,
-                    config_dir=config_dir,
-                    base_path=include_path,
-                    warnings=warnings,
-                    resolve_templates=resolve_templates,
-                    resolve_ha_includes=resolve_ha_includes,
-                    _depth=_depth + 1,
-                )
+                loaded = _load_yaml_file(include_path, ctx.warnings)
+                return _expand(loaded, ctx, include_path, depth + 1)
 
             if value.tag == "!include_dir_list":
-                if not include_path.exists() or not include_path.is_dir():
-                    warnings.append(f"{value.tag} directory not found: {include_arg}")
+                if not include_path.is_dir():
+                    ctx.warnings.append(f"{value.tag} directory not found: {include_arg}")
                     return []
                 items: list[Any] = []
-                for child in sorted(include_path.glob("*.y*ml")):
-                    loaded = _load_yaml_file(child, warnings)
-                    expanded_child = expand_includes(
-                        loaded,
-                        config_dir=config_dir,
-                        base_path=child,
-                        warnings=warnings,
-                        resolve_templates=resolve_templates,
-                        resolve_ha_includes=resolve_ha_includes,
-                        _depth=_depth + 1,
-                    )
+                children = _list_yaml_children(include_path)
+                for child, loaded in zip(children, _load_yaml_files(children, ctx.warnings)):
+                    expanded_child = _expand(loaded, ctx, child, depth + 1)
                     if expanded_child is SKIP:
                         continue
                     items.append(expanded_child)
                 return items
 
             if value.tag == "!include_dir_merge_list":
-                if not include_path.exists() or not include_path.is_dir():
-                    warnings.append(f"{value.tag} directory not found: {include_arg}")
+                if not include_path.is_dir():
+                    ctx.warnings.append(f"{value.tag} directory not found: {include_arg}")
                     return []
                 merged: list[Any] = []
-                for child in sorted(include_path.glob("*.y*ml")):
-                    loaded = _load_yaml_file(child, warnings)
-                    expanded_child = expand_includes(
-                        loaded,
-                        config_dir=config_dir,
-                        base_path=child,
-                        warnings=warnings,
-                        resolve_templates=resolve_templates,
-                        resolve_ha_includes=resolve_ha_includes,
-                        _depth=_depth + 1,
-                    )
+                children = _list_yaml_children(include_path)
+                for child, loaded in zip(children, _load_yaml_files(children, ctx.warnings)):
+                    expanded_child = _expand(loaded, ctx, child, depth + 1)
                     if expanded_child is SKIP:
                         continue
                     if isinstance(expanded_child, list):
@@ -302,27 +511,19 @@ def expand_includes(
                 return merged
 
             if value.tag in {"!include_dir_named", "!include_dir_merge_named"}:
-                if not include_path.exists() or not include_path.is_dir():
-                    warnings.append(f"{value.tag} directory not found: {include_arg}")
+                if not include_path.is_dir():
+                    ctx.warnings.append(f"{value.tag} directory not found: {include_arg}")
                     return {}
                 result: dict[str, Any] = {}
-                for child in sorted(include_path.glob("*.y*ml")):
+                children = _list_yaml_children(include_path)
+                for child, loaded in zip(children, _load_yaml_files(children, ctx.warnings)):
                     key = child.stem
-                    loaded = _load_yaml_file(child, warnings)
-                    expanded_child = expand_includes(
-                        loaded,
-                        config_dir=config_dir,
-                        base_path=child,
-                        warnings=warnings,
-                        resolve_templates=resolve_templates,
-                        resolve_ha_includes=resolve_ha_includes,
-                        _depth=_depth + 1,
-                    )
+                    expanded_child = _expand(loaded, ctx, child, depth + 1)
                     if expanded_child is SKIP:
                         continue
                     if value.tag == "!include_dir_merge_named":
                         if isinstance(expanded_child, dict) and isinstance(result.get(key), dict):
-                            result[key] = _deep_merge(result[key], expanded_child)
+                            _deep_merge_into(result[key], expanded_child)
                         else:
                             result[key] = expanded_child
                     else:
@@ -331,18 +532,14 @@ def expand_includes(
 
         # Preserve tag but expand nested structures.
         nested = value.value
+        inline_leaves = depth < _MAX_INCLUDE_DEPTH
         if isinstance(nested, dict):
             output: dict[str, Any] = {}
             for key, nested_value in nested.items():
-                expanded_value = expand_includes(
-                    nested_value,
-                    config_dir=config_dir,
-                    base_path=base_path,
-                    warnings=warnings,
-                    resolve_templates=resolve_templates,
-                    resolve_ha_includes=resolve_ha_includes,
-                    _depth=_depth + 1,
-                )
+                if inline_leaves and not isinstance(nested_value, _EXPANDABLE_TYPES):
+                    output[key] = nested_value
+                    continue
+                expanded_value = _expand(nested_value, ctx, base_path, depth + 1)
                 if expanded_value is SKIP:
                     continue
                 output[key] = expanded_value
@@ -354,33 +551,24 @@ def expand_includes(
         if isinstance(nested, list):
             output: list[Any] = []
             for entry in nested:
-                expanded_value = expand_includes(
-                    entry,
-                    config_dir=config_dir,
-                    base_path=base_path,
-                    warnings=warnings,
-                    resolve_templates=resolve_templates,
-                    resolve_ha_includes=resolve_ha_includes,
-                    _depth=_depth + 1,
-                )
+                if inline_leaves and not isinstance(entry, _EXPANDABLE_TYPES):
+                    output.append(entry)
+                    continue
+                expanded_value = _expand(entry, ctx, base_path, depth + 1)
                 if expanded_value is SKIP:
                     continue
                 output.append(expanded_value)
             return TaggedValue(tag=value.tag, value=output, line=value.line)
         return value
 
+    inline_leaves = depth < _MAX_INCLUDE_DEPTH
     if isinstance(value, dict):
         output: dict[str, Any] = {}
         for key, nested_value in value.items():
-            expanded_value = expand_includes(
-                nested_value,
-                config_dir=config_dir,
-                base_path=base_path,
-                warnings=warnings,
-                resolve_templates=resolve_templates,
-                resolve_ha_includes=resolve_ha_includes,
-                _depth=_depth + 1,
-            )
+            if inline_leaves and not isinstance(nested_value, _EXPANDABLE_TYPES):
+                output[key] = nested_value
+                continue
+            expanded_value = _expand(nested_value, ctx, base_path, depth + 1)
             if expanded_value is SKIP:
                 continue
             output[key] = expanded_value
@@ -388,15 +576,10 @@ def expand_includes(
     if isinstance(value, list):
         output: list[Any] = []
         for entry in value:
-            expanded = expand_includes(
-                entry,
-                config_dir=config_dir,
-                base_path=base_path,
-                warnings=warnings,
-                resolve_templates=resolve_templates,
-                resolve_ha_includes=resolve_ha_includes,
-                _depth=_depth + 1,
-            )
+            if inline_leaves and not isinstance(entry, _EXPANDABLE_TYPES):
+                output.append(entry)
+                continue
+            expanded = _expand(entry, ctx, base_path, depth + 1)
             if expanded is SKIP:
                 continue
             output.append(expanded)
@@ -411,21 +594,13 @@ def state_group_candidates(states: list[dict[str, Any]], allowed_domains: set[st
     that as the primary signal and then filter by allowed domains (e.g. group/sensor/light).
     """
 
-    rows: list[dict[str, Any]] = []
-    for state in states:
-        if not isinstance(state, dict):
-            continue
-        entity_id = state.get("entity_id")
-        if not isinstance(entity_id, str) or "." not in entity_id:
-            continue
-        domain = entity_id.split(".", 1)[0]
-        if domain not in allowed_domains:
-            continue
-        attrs = state.get("attributes")
-        if not isinstance(attrs, dict):
-            continue
-        members = attrs.get("entity_id")
-        if not isinstance(members, list):
-            continue
-        rows.append(state)
-    return rows
+    return [
+        state
+        for state in states
+        if isinstance(state, dict)
+        and isinstance(entity_id := state.get("entity_id"), str)
+        and (dot := entity_id.find(".")) != -1
+        and entity_id[:dot] in allowed_domains
+        and isinstance(attrs := state.get("attributes"), dict)
+        and isinstance(attrs.get("entity_id"), list)
+    ]
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib.abc
+import importlib.machinery
+import itertools
+import sys
+import types
+from pathlib import Path
+
+import pytest
+import yaml
+
+APP_DIR = Path(__file__).resolve().parents[1] / "rootfs/app"
+APP_PATH = APP_DIR / "main.py"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+MAIN_CODE = compile(APP_PATH.read_bytes(), str(APP_PATH), "exec")
+OPTIONS_BYTES = b'{"yaml_modules_enabled": true}'
+PACKAGE_DIR = APP_PATH.parent / "gitops_bridge"
+# Every gitops_bridge module name, so load_main can drop them without scanning sys.modules.
+GITOPS_MODULES = (
+    "gitops_bridge",
+    *(
+        ".".join(("gitops_bridge", *path.relative_to(PACKAGE_DIR).with_suffix("").parts))
+        for path in PACKAGE_DIR.rglob("*.py")
+        if path.name != "__init__.py"
+    ),
+)
+MAIN_MODULE_IDS = itertools.count()
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class _CachedCodeLoader(importlib.machinery.SourceFileLoader):
+    """Source loader that compiles each `gitops_bridge` file once per test session.
+
+    Tests re-import the package for every test so settings and module-level caches start fresh;
+    reusing the compiled code keeps that isolation while skipping the repeated parse/compile.
+    """
+
+    _code_by_path: dict[str, types.CodeType] = {}
+
+    def get_code(self, fullname: str) -> types.CodeType:
+        code = self._code_by_path.get(self.path)
+        if code is None:
+            code = super().get_code(fullname)
+            self._code_by_path[self.path] = code
+        return code
+
+
+class _CachedCodeFinder(importlib.abc.MetaPathFinder):
+    """Route `gitops_bridge` imports through `_CachedCodeLoader`."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "gitops_bridge" and not fullname.startswith("gitops_bridge."):
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is not None and type(spec.loader) is importlib.machinery.SourceFileLoader:
+            spec.loader = _CachedCodeLoader(fullname, spec.origin)
+        return spec
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _cache_gitops_bridge_code():
+    finder = _CachedCodeFinder()
+    sys.meta_path.insert(0, finder)
+    yield
+    sys.meta_path.remove(finder)
+
+
+@pytest.fixture(scope="module")
+def runner():
+    """Event loop runner shared by the async calls in one test module."""
+    with asyncio.Runner() as loop_runner:
+        yield loop_runner
+
+
+def _load_main(tmp_path: Path, options_path: Path, monkeypatch: pytest.MonkeyPatch):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir(parents=True, exist_ok=True)
+
+    monkeypatch.setenv("HASS_CONFIG_DIR", str(config_dir))
+    monkeypatch.setenv("HASS_OPTIONS_PATH", str(options_path))
+
+    for module_name in GITOPS_MODULES:
+        sys.modules.pop(module_name, None)
+
+    module = types.ModuleType(f"ha_gitops_main_{next(MAIN_MODULE_IDS)}")
+    module.__file__ = str(APP_PATH)
+    exec(MAIN_CODE, module.__dict__)
+    return module, config_dir
+
+
+@pytest.fixture(scope="session")
+def options_path(tmp_path_factory) -> Path:
+    """Write the add-on options once per session; the app only ever reads this file."""
+    path = tmp_path_factory.mktemp("options") / "options.json"
+    path.write_bytes(OPTIONS_BYTES)
+    return path
+
+
+@pytest.fixture
+def load_main(options_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Return a loader that runs the add-on entrypoint against a fresh config dir."""
+    return functools.partial(_load_main, options_path=options_path, monkeypatch=monkeypatch)
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    # Most fixture writes land in existing directories; only walk the parents on a miss.
+    try:
+        path.write_bytes(data)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def _write_text(path: Path, text: str) -> None:
+    _write_bytes(path, text.encode("utf-8"))
+
+
+class _ReprKey:
+    """Hashable stand-in for a YAML payload, compared by its repr."""
+
+    __slots__ = ("data", "key")
+
+    def __init__(self, data) -> None:
+        self.data = data
+        self.key = repr(data)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _ReprKey) and self.key == other.key
+
+
+# Fixture payloads repeat across tests; repr is cheap and as order-sensitive as the dump.
+@functools.lru_cache(maxsize=256)
+def _dump_yaml(payload: _ReprKey) -> bytes:
+    return yaml.dump(payload.data, Dumper=YAML_DUMPER, sort_keys=False, encoding="utf-8")
+
+
+def _write_yaml(path: Path, data) -> None:
+    _write_bytes(path, _dump_yaml(_ReprKey(data)))
+
+
+def _read_yaml(path: Path):
+    return yaml.load(path.read_bytes(), Loader=YAML_LOADER)
+
+
+def _get_yaml_modules_module():
+    return sys.modules["gitops_bridge.yaml_modules"]
+
+
+@pytest.fixture(scope="session")
+def write_text():
+    """Return a helper that writes UTF-8 text, creating parent dirs as needed."""
+    return _write_text
+
+
+@pytest.fixture(scope="session")
+def write_yaml():
+    """Return a helper that dumps data to a YAML file, creating parent dirs as needed."""
+    return _write_yaml
+
+
+@pytest.fixture(scope="session")
+def read_yaml():
+    """Return a helper that parses a YAML file with the safe loader."""
+    return _read_yaml
+
+
+@pytest.fixture(scope="session")
+def get_yaml_modules_module():
+    """Return a getter for the `gitops_bridge.yaml_modules` imported by the latest `load_main`."""
+    return _get_yaml_modules_module
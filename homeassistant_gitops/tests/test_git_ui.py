@@ -1,37 +1,10 @@
-import importlib.machinery
-import importlib.util
-import json
-import os
+import shutil
+import subprocess
 import sys
-import uuid
 from pathlib import Path
 
 import pytest
 
-REPO_ROOT = Path(__file__).resolve().parents[2]
-APP_PATH = REPO_ROOT / "homeassistant_gitops/rootfs/app/main.py"
-
-
-def load_main(tmp_path: Path):
-    config_dir = tmp_path / "config"
-    config_dir.mkdir(parents=True, exist_ok=True)
-    options_path = tmp_path / "options.json"
-    options_path.write_text(json.dumps({"yaml_modules_enabled": True}), encoding="utf-8")
-
-    os.environ["HASS_CONFIG_DIR"] = str(config_dir)
-    os.environ["HASS_OPTIONS_PATH"] = str(options_path)
-
-    for module_name in list(sys.modules):
-        if module_name.startswith("gitops_bridge"):
-            sys.modules.pop(module_name, None)
-
-    module_name = f"ha_gitops_main_{uuid.uuid4().hex}"
-    loader = importlib.machinery.SourceFileLoader(module_name, str(APP_PATH))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
-    loader.exec_module(module)
-    return module, config_dir
-
 
 def get_git_ops():
     return sys.modules["gitops_bridge.git_ops"]
@@ -41,17 +14,28 @@ def get_gitignore_ops():
     return sys.modules["gitops_bridge.gitignore_ops"]
 
 
-def init_repo(git_ops):
-    git_ops.run_git(["init", "-b", "main"])
-    git_ops.run_git(["config", "user.name", "Test User"])
-    git_ops.run_git(["config", "user.email", "test@example.com"])
+@pytest.fixture(scope="module")
+def repo_template(tmp_path_factory) -> Path:
+    """Initialize one empty repo per module; tests copy its `.git` instead of re-running git."""
+    template = tmp_path_factory.mktemp("repo_template")
+    for args in (
+        ["init", "-b", "main"],
+        ["config", "user.name", "Test User"],
+        ["config", "user.email", "test@example.com"],
+    ):
+        subprocess.run(["git", *args], cwd=template, check=True, capture_output=True)
+    return template / ".git"
+
+
+def init_repo(config_dir: Path, repo_template: Path) -> None:
+    shutil.copytree(repo_template, config_dir / ".git")
 
 
-def test_git_list_files_modes(tmp_path: Path) -> None:
+def test_git_list_files_modes(tmp_path: Path, load_main, repo_template: Path) -> None:
     _, config_dir = load_main(tmp_path)
     git_ops = get_git_ops()
 
-    init_repo(git_ops)
+    init_repo(config_dir, repo_template)
     (config_dir / "automations.yaml").write_text("one\n", encoding="utf-8")
     (config_dir / "scripts.yaml").write_text("base\n", encoding="utf-8")
     git_ops.run_git(["add", "-A"])
@@ -84,11 +68,11 @@ def test_git_list_files_modes(tmp_path: Path) -> None:
     assert any(entry["path"] == "ignored.log" and entry["ignored"] for entry in all_with_ignored)
 
 
-def test_git_file_preview_head_and_binary(tmp_path: Path) -> None:
+def test_git_file_preview_head_and_binary(tmp_path: Path, load_main, repo_template: Path) -> None:
     _, config_dir = load_main(tmp_path)
     git_ops = get_git_ops()
 
-    init_repo(git_ops)
+    init_repo(config_dir, repo_template)
     (config_dir / "text.txt").write_text("hello\n", encoding="utf-8")
     (config_dir / "binary.bin").write_bytes(b"\x00\x01\x02\x03")
     git_ops.run_git(["add", "-A"])
@@ -102,12 +86,14 @@ def test_git_file_preview_head_and_binary(tmp_path: Path) -> None:
     assert binary_preview["is_binary"] is True
 
 
-def test_gitignore_override_and_path_validation(tmp_path: Path) -> None:
+def test_gitignore_override_and_path_validation(
+    tmp_path: Path, load_main, repo_template: Path
+) -> None:
     _, config_dir = load_main(tmp_path)
     git_ops = get_git_ops()
     gitignore_ops = get_gitignore_ops()
 
-    init_repo(git_ops)
+    init_repo(config_dir, repo_template)
     (config_dir / ".gitignore").write_text("ignored.txt\n", encoding="utf-8")
     (config_dir / "ignored.txt").write_text("secret\n", encoding="utf-8")
 
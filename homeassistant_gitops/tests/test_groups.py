@@ -1,50 +1,14 @@
-import asyncio
-import importlib.machinery
-import importlib.util
-import json
-import os
 import sys
-import uuid
 from pathlib import Path
 
 import pytest
 
-yaml = pytest.importorskip("yaml")
-
-REPO_ROOT = Path(__file__).resolve().parents[2]
-APP_PATH = REPO_ROOT / "homeassistant_gitops/rootfs/app/main.py"
-
-
-def load_main(tmp_path: Path):
-    config_dir = tmp_path / "config"
-    config_dir.mkdir(parents=True, exist_ok=True)
-    options_path = tmp_path / "options.json"
-    options_path.write_text(json.dumps({"yaml_modules_enabled": True}), encoding="utf-8")
-
-    os.environ["HASS_CONFIG_DIR"] = str(config_dir)
-    os.environ["HASS_OPTIONS_PATH"] = str(options_path)
-
-    for module_name in list(sys.modules):
-        if module_name.startswith("gitops_bridge"):
-            sys.modules.pop(module_name, None)
-
-    module_name = f"ha_gitops_main_{uuid.uuid4().hex}"
-    loader = importlib.machinery.SourceFileLoader(module_name, str(APP_PATH))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
-    loader.exec_module(module)
-    return module, config_dir
-
 
 def get_groups_module():
     return sys.modules["gitops_bridge.groups"]
 
 
-def read_yaml(path: Path):
-    return yaml.safe_load(path.read_text(encoding="utf-8"))
-
-
-def test_groups_config_round_trip(tmp_path: Path) -> None:
+def test_groups_config_round_trip(tmp_path: Path, load_main) -> None:
     _main, config_dir = load_main(tmp_path)
     groups = get_groups_module()
 
@@ -59,7 +23,9 @@ def test_groups_config_round_trip(tmp_path: Path) -> None:
     assert loaded["ignored"]["entity_ids"] == ["group.kitchen"]
 
 
-def test_upsert_group_creates_one_off_module_and_syncs(tmp_path: Path) -> None:
+def test_upsert_group_creates_one_off_module_and_syncs(
+    tmp_path: Path, load_main, read_yaml
+) -> None:
     _main, config_dir = load_main(tmp_path)
     groups = get_groups_module()
 
@@ -99,7 +65,7 @@ def test_upsert_group_creates_one_off_module_and_syncs(tmp_path: Path) -> None:
     )
 
 
-def test_delete_group_removes_definition(tmp_path: Path) -> None:
+def test_delete_group_removes_definition(tmp_path: Path, load_main, read_yaml) -> None:
     _main, config_dir = load_main(tmp_path)
     groups = get_groups_module()
 
@@ -121,7 +87,7 @@ def test_delete_group_removes_definition(tmp_path: Path) -> None:
     assert not (config_dir / "groups.yaml").exists()
 
 
-def test_restart_ack_tracks_changes(tmp_path: Path) -> None:
+def test_restart_ack_tracks_changes(tmp_path: Path, load_main) -> None:
     _main, _config_dir = load_main(tmp_path)
     groups = get_groups_module()
 
@@ -152,7 +118,9 @@ def test_restart_ack_tracks_changes(tmp_path: Path) -> None:
     assert status["restart_needed"] is True
 
 
-def test_import_group_writes_yaml(tmp_path: Path, monkeypatch) -> None:
+def test_import_group_writes_yaml(
+    tmp_path: Path, load_main, read_yaml, monkeypatch, runner
+) -> None:
     _main, config_dir = load_main(tmp_path)
     groups = get_groups_module()
 
@@ -169,7 +137,7 @@ def test_import_group_writes_yaml(tmp_path: Path, monkeypatch) -> None:
 
     monkeypatch.setattr(groups, "_fetch_states", fake_fetch_states)
 
-    result = asyncio.run(
+    result = runner.run(
         groups.import_group(
             {
                 "entity_id": "group.kitchen",
@@ -185,7 +153,9 @@ def test_import_group_writes_yaml(tmp_path: Path, monkeypatch) -> None:
     assert module_yaml["kitchen"]["entities"] == ["light.a", "switch.b"]
 
 
-def test_collision_check_rejects_unmanaged_group(tmp_path: Path, monkeypatch) -> None:
+def test_collision_check_rejects_unmanaged_group(
+    tmp_path: Path, load_main, monkeypatch, runner
+) -> None:
     load_main(tmp_path)
     groups = get_groups_module()
 
@@ -195,6 +165,6 @@ def test_collision_check_rejects_unmanaged_group(tmp_path: Path, monkeypatch) ->
     monkeypatch.setattr(groups, "_fetch_states", fake_fetch_states)
 
     with pytest.raises(groups.GroupsError) as exc:
-        asyncio.run(groups.assert_no_unmanaged_group_collision("kitchen"))
+        runner.run(groups.assert_no_unmanaged_group_collision("kitchen"))
 
     assert exc.value.status_code == 409
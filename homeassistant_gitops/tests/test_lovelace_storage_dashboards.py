@@ -1,62 +1,17 @@
-import importlib.machinery
-import importlib.util
 import json
-import os
-import sys
-import uuid
+import shutil
 from pathlib import Path
 
 import pytest
 
-yaml = pytest.importorskip("yaml")
+DASHBOARD_ID = "dashboard_test"
+DASHBOARD_CONFIG = {"views": [{"title": "One", "path": "one", "cards": []}]}
 
-REPO_ROOT = Path(__file__).resolve().parents[2]
-APP_PATH = REPO_ROOT / "homeassistant_gitops/rootfs/app/main.py"
-
-
-def load_main(tmp_path: Path):
-    config_dir = tmp_path / "config"
-    config_dir.mkdir(parents=True, exist_ok=True)
-    options_path = tmp_path / "options.json"
-    options_path.write_text(json.dumps({"yaml_modules_enabled": True}), encoding="utf-8")
-
-    os.environ["HASS_CONFIG_DIR"] = str(config_dir)
-    os.environ["HASS_OPTIONS_PATH"] = str(options_path)
-
-    for module_name in list(sys.modules):
-        if module_name.startswith("gitops_bridge"):
-            sys.modules.pop(module_name, None)
-
-    module_name = f"ha_gitops_main_{uuid.uuid4().hex}"
-    loader = importlib.machinery.SourceFileLoader(module_name, str(APP_PATH))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
-    loader.exec_module(module)
-    return module, config_dir
-
-
-def get_yaml_modules_module():
-    return sys.modules["gitops_bridge.yaml_modules"]
-
-
-def write_text(path: Path, text: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding="utf-8")
-
-
-def write_yaml(path: Path, data) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
-
-
-def test_update_exports_storage_dashboards_to_unassigned(tmp_path: Path) -> None:
-    load_main(tmp_path)
-    yaml_modules = get_yaml_modules_module()
-
-    storage_dir = Path(os.environ["HASS_CONFIG_DIR"]) / ".storage"
-    dashboards_path = storage_dir / "lovelace_dashboards"
-    dashboard_id = "dashboard_test"
 
+@pytest.fixture(scope="module")
+def storage_template(tmp_path_factory, write_text) -> Path:
+    """Write the storage dashboard registry and its config once; tests copy the directory."""
+    storage_dir = tmp_path_factory.mktemp("storage_template") / ".storage"
     dashboards_payload = {
         "version": 1,
         "minor_version": 1,
@@ -64,7 +19,7 @@ def test_update_exports_storage_dashboards_to_unassigned(tmp_path: Path) -> None
         "data": {
             "items": [
                 {
-                    "id": dashboard_id,
+                    "id": DASHBOARD_ID,
                     "title": "Test",
                     "icon": "mdi:test-tube",
                     "url_path": "dashboard-test",
@@ -75,123 +30,107 @@ def test_update_exports_storage_dashboards_to_unassigned(tmp_path: Path) -> None
             ]
         },
     }
-    write_text(dashboards_path, json.dumps(dashboards_payload, indent=2))
-
-    config = {"views": [{"title": "One", "path": "one", "cards": []}]}
+    write_text(storage_dir / "lovelace_dashboards", json.dumps(dashboards_payload))
     storage_payload = {
         "version": 1,
         "minor_version": 1,
-        "key": f"lovelace.{dashboard_id}",
-        "data": {"config": config},
+        "key": f"lovelace.{DASHBOARD_ID}",
+        "data": {"config": DASHBOARD_CONFIG},
     }
-    write_text(storage_dir / f"lovelace.{dashboard_id}", json.dumps(storage_payload, indent=2))
+    write_text(storage_dir / f"lovelace.{DASHBOARD_ID}", json.dumps(storage_payload))
+    return storage_dir
+
+
+def test_update_exports_storage_dashboards_to_unassigned(
+    tmp_path: Path,
+    load_main,
+    read_yaml,
+    write_yaml,
+    get_yaml_modules_module,
+    storage_template: Path,
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_modules = get_yaml_modules_module()
+    shutil.copytree(storage_template, config_dir / ".storage")
 
-    config_dir = Path(os.environ["HASS_CONFIG_DIR"])
     stale_path = config_dir / "packages/unassigned/lovelace.stale.unassigned.yaml"
     write_yaml(stale_path, {"views": []})
 
     result = yaml_modules.update_yaml_modules()
-    exported_path = config_dir / f"packages/unassigned/lovelace.{dashboard_id}.unassigned.yaml"
+    exported_rel = f"packages/unassigned/lovelace.{DASHBOARD_ID}.unassigned.yaml"
+    exported_path = config_dir / exported_rel
     assert exported_path.exists()
-    assert yaml.safe_load(exported_path.read_text(encoding="utf-8")) == config
+    exported = read_yaml(exported_path)
+    assert exported == DASHBOARD_CONFIG
     assert not stale_path.exists()
-    assert (
-        f"packages/unassigned/lovelace.{dashboard_id}.unassigned.yaml"
-        in result.get("changed_files", [])
-    )
-
-
-def test_sync_exports_storage_dashboards_to_unassigned(tmp_path: Path) -> None:
-    load_main(tmp_path)
+    assert exported_rel in result.get("changed_files", [])
+
+
+def test_sync_exports_storage_dashboards_to_unassigned(
+    tmp_path: Path,
+    load_main,
+    read_yaml,
+    write_yaml,
+    get_yaml_modules_module,
+    storage_template: Path,
+) -> None:
+    _, config_dir = load_main(tmp_path)
     yaml_modules = get_yaml_modules_module()
-
-    config_dir = Path(os.environ["HASS_CONFIG_DIR"])
-    storage_dir = config_dir / ".storage"
-    dashboard_id = "dashboard_test"
-
-    config = {"views": [{"title": "One", "path": "one", "cards": []}]}
-    storage_payload = {
-        "version": 1,
-        "minor_version": 1,
-        "key": f"lovelace.{dashboard_id}",
-        "data": {"config": config},
-    }
-    write_text(storage_dir / f"lovelace.{dashboard_id}", json.dumps(storage_payload, indent=2))
+    shutil.copytree(storage_template, config_dir / ".storage")
+    # No dashboard registry: covers the fallback that discovers `.storage/lovelace.*` files.
+    (config_dir / ".storage/lovelace_dashboards").unlink()
 
     stale_path = config_dir / "packages/unassigned/lovelace.stale.unassigned.yaml"
     write_yaml(stale_path, {"views": []})
 
     result = yaml_modules.sync_yaml_modules()
-    exported_path = config_dir / f"packages/unassigned/lovelace.{dashboard_id}.unassigned.yaml"
+    exported_rel = f"packages/unassigned/lovelace.{DASHBOARD_ID}.unassigned.yaml"
+    exported_path = config_dir / exported_rel
     assert exported_path.exists()
-    assert yaml.safe_load(exported_path.read_text(encoding="utf-8")) == config
+    exported = read_yaml(exported_path)
+    assert exported == DASHBOARD_CONFIG
     assert stale_path.exists()
-    assert (
-        f"packages/unassigned/lovelace.{dashboard_id}.unassigned.yaml"
-        in result.get("changed_files", [])
-    )
+    assert exported_rel in result.get("changed_files", [])
 
 
-def test_build_uses_first_package_dashboard_override(tmp_path: Path) -> None:
-    load_main(tmp_path)
+def test_build_uses_first_package_dashboard_override(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module, storage_template: Path
+) -> None:
+    _, config_dir = load_main(tmp_path)
     yaml_modules = get_yaml_modules_module()
-
-    config_dir = Path(os.environ["HASS_CONFIG_DIR"])
     storage_dir = config_dir / ".storage"
-    dashboards_path = storage_dir / "lovelace_dashboards"
-    dashboard_id = "dashboard_test"
-
-    dashboards_payload = {
-        "version": 1,
-        "minor_version": 1,
-        "key": "lovelace_dashboards",
-        "data": {"items": [{"id": dashboard_id, "mode": "storage"}]},
-    }
-    write_text(dashboards_path, json.dumps(dashboards_payload, indent=2))
-    write_text(
-        storage_dir / f"lovelace.{dashboard_id}",
-        json.dumps(
-            {
-                "version": 1,
-                "minor_version": 1,
-                "key": f"lovelace.{dashboard_id}",
-                "data": {"config": {"views": []}},
-            },
-            indent=2,
-        ),
-    )
+    shutil.copytree(storage_template, storage_dir)
 
     config_a = {"views": [{"title": "From A", "path": "a", "cards": []}]}
     config_b = {"views": [{"title": "From B", "path": "b", "cards": []}]}
-    write_yaml(config_dir / f"packages/aaa/lovelace.{dashboard_id}.yaml", config_a)
-    write_yaml(config_dir / f"packages/zzz/lovelace.{dashboard_id}.yaml", config_b)
+    write_yaml(config_dir / f"packages/aaa/lovelace.{DASHBOARD_ID}.yaml", config_a)
+    write_yaml(config_dir / f"packages/zzz/lovelace.{DASHBOARD_ID}.yaml", config_b)
 
     result = yaml_modules.build_yaml_modules()
-    storage_payload = json.loads((storage_dir / f"lovelace.{dashboard_id}").read_text(encoding="utf-8"))
+    storage_payload = json.loads((storage_dir / f"lovelace.{DASHBOARD_ID}").read_text(encoding="utf-8"))
     assert storage_payload["data"]["config"] == config_a
     assert any(
-        f"Duplicate lovelace dashboard {dashboard_id}" in warning
+        f"Duplicate lovelace dashboard {DASHBOARD_ID}" in warning
         for warning in result.get("warnings", [])
     )
 
 
-def test_index_includes_unassigned_storage_dashboard_files(tmp_path: Path) -> None:
-    load_main(tmp_path)
+def test_index_includes_unassigned_storage_dashboard_files(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module
+) -> None:
+    _, config_dir = load_main(tmp_path)
     yaml_modules = get_yaml_modules_module()
-
-    config_dir = Path(os.environ["HASS_CONFIG_DIR"])
-    dashboard_path = config_dir / "packages/unassigned/lovelace.dashboard_test.unassigned.yaml"
-    write_yaml(dashboard_path, {"views": []})
-
-    legacy_path = config_dir / "lovelace/lovelace.unassigned.yaml"
-    write_yaml(legacy_path, {"views": []})
+    dashboard_rel = "packages/unassigned/lovelace.dashboard_test.unassigned.yaml"
+    legacy_rel = "lovelace/lovelace.unassigned.yaml"
+    write_yaml(config_dir / dashboard_rel, {"views": []})
+    write_yaml(config_dir / legacy_rel, {"views": []})
 
     index = yaml_modules.list_yaml_modules_index()
     modules = {module["id"]: module for module in index.get("modules", [])}
     lovelace_unassigned = modules["unassigned:lovelace"]["files"]
-    assert "packages/unassigned/lovelace.dashboard_test.unassigned.yaml" in lovelace_unassigned
-    assert "lovelace/lovelace.unassigned.yaml" in lovelace_unassigned
+    assert dashboard_rel in lovelace_unassigned
+    assert legacy_rel in lovelace_unassigned
 
-    items = yaml_modules.list_module_items("packages/unassigned/lovelace.dashboard_test.unassigned.yaml")
+    items = yaml_modules.list_module_items(dashboard_rel)
     assert items["file_kind"] == "file"
     assert items["items"] == []
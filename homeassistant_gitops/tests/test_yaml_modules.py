@@ -1,55 +1,16 @@
-import importlib.machinery
-import importlib.util
-import json
 import os
 import sys
-import uuid
 from pathlib import Path
 
 import pytest
 
 yaml = pytest.importorskip("yaml")
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-REPO_ROOT = Path(__file__).resolve().parents[2]
-APP_PATH = REPO_ROOT / "homeassistant_gitops/rootfs/app/main.py"
 
-
-def load_main(tmp_path: Path):
-    config_dir = tmp_path / "config"
-    config_dir.mkdir(parents=True, exist_ok=True)
-    options_path = tmp_path / "options.json"
-    options_path.write_text(json.dumps({"yaml_modules_enabled": True}), encoding="utf-8")
-
-    os.environ["HASS_CONFIG_DIR"] = str(config_dir)
-    os.environ["HASS_OPTIONS_PATH"] = str(options_path)
-
-    for module_name in list(sys.modules):
-        if module_name.startswith("gitops_bridge"):
-            sys.modules.pop(module_name, None)
-
-    module_name = f"ha_gitops_main_{uuid.uuid4().hex}"
-    loader = importlib.machinery.SourceFileLoader(module_name, str(APP_PATH))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
-    loader.exec_module(module)
-    return module, config_dir
-
-
-def write_yaml(path: Path, data) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
-
-
-def write_text(path: Path, text: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding="utf-8")
-
-
-def get_yaml_modules_module():
-    return sys.modules["gitops_bridge.yaml_modules"]
-
-
-def test_list_yaml_modules_index_includes_packages_one_offs_and_unassigned(tmp_path: Path) -> None:
+def test_list_yaml_modules_index_includes_packages_one_offs_and_unassigned(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module
+) -> None:
     _, config_dir = load_main(tmp_path)
 
     write_yaml(
@@ -86,7 +47,7 @@ def test_list_yaml_modules_index_includes_packages_one_offs_and_unassigned(tmp_p
     )
 
 
-def test_module_file_round_trip(tmp_path: Path) -> None:
+def test_module_file_round_trip(tmp_path: Path, load_main, get_yaml_modules_module) -> None:
     _, config_dir = load_main(tmp_path)
     target = config_dir / "automations/demo.yaml"
     target.parent.mkdir(parents=True, exist_ok=True)
@@ -96,14 +57,35 @@ def test_module_file_round_trip(tmp_path: Path) -> None:
     payload = yaml_modules.read_module_file("automations/demo.yaml")
     assert "alias: demo" in payload["content"]
 
-    yaml_modules.write_module_file("automations/demo.yaml", "alias: updated\n")
+    saved = yaml_modules.write_module_file("automations/demo.yaml", "alias: updated\n")
     assert target.read_text(encoding="utf-8") == "alias: updated\n"
+    assert saved["hash"] == yaml_modules.read_module_file("automations/demo.yaml")["hash"]
+    assert sorted(path.name for path in target.parent.iterdir()) == ["demo.yaml"]
 
     yaml_modules.delete_module_file("automations/demo.yaml")
     assert not target.exists()
 
 
-def test_module_file_rejects_invalid_path(tmp_path: Path) -> None:
+def test_module_file_crlf_save_hash_matches_read_and_keeps_mode(
+    tmp_path: Path, load_main, get_yaml_modules_module
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    target = config_dir / "automations/demo.yaml"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text("alias: demo\n", encoding="utf-8")
+    target.chmod(0o600)
+
+    yaml_modules = get_yaml_modules_module()
+    saved = yaml_modules.write_module_file("automations/demo.yaml", "alias: x\r\nid: y\r")
+    assert target.read_bytes() == b"alias: x\r\nid: y\r"
+    assert saved["hash"] == yaml_modules.read_module_file("automations/demo.yaml")["hash"]
+    assert target.stat().st_mode & 0o777 == 0o600
+    assert sorted(path.name for path in target.parent.iterdir()) == ["demo.yaml"]
+
+
+def test_module_file_rejects_invalid_path(
+    tmp_path: Path, load_main, get_yaml_modules_module
+) -> None:
     load_main(tmp_path)
     yaml_modules = get_yaml_modules_module()
 
@@ -111,57 +93,49 @@ def test_module_file_rejects_invalid_path(tmp_path: Path) -> None:
         yaml_modules.read_module_file("../secrets.yaml")
 
 
-def test_sync_builds_domain_and_unassigned(tmp_path: Path) -> None:
+@pytest.fixture
+def wakeup_config(tmp_path: Path, load_main, write_yaml):
+    """Load main over a `wakeup` package automation plus one UI-only domain automation."""
     main, config_dir = load_main(tmp_path)
-
     write_yaml(
         config_dir / "packages/wakeup/automation.yaml",
         [{"alias": "Wake up", "trigger": []}],
     )
-    write_yaml(
-        config_dir / "automations/dishwasher.yaml",
-        [{"alias": "Dishwasher", "trigger": []}],
-    )
     write_yaml(
         config_dir / "automations.yaml",
         [{"alias": "UI only", "trigger": []}],
     )
+    return main, config_dir
+
+
+def test_sync_builds_domain_and_unassigned(wakeup_config, write_yaml, read_yaml) -> None:
+    main, config_dir = wakeup_config
+    write_yaml(
+        config_dir / "automations/dishwasher.yaml",
+        [{"alias": "Dishwasher", "trigger": []}],
+    )
 
     result = main.sync_yaml_modules()
     assert result["status"] == "synced"
 
-    domain_items = yaml.safe_load((config_dir / "automations.yaml").read_text(encoding="utf-8"))
+    domain_items = read_yaml(config_dir / "automations.yaml")
     assert len(domain_items) == 3
     assert all("id" in item for item in domain_items)
     aliases = {item.get("alias") for item in domain_items}
     assert {"Wake up", "Dishwasher", "UI only"} <= aliases
 
-    unassigned = yaml.safe_load(
-        (config_dir / "packages/unassigned/automation.yaml").read_text(encoding="utf-8")
-    )
+    unassigned = read_yaml(config_dir / "packages/unassigned/automation.yaml")
     assert unassigned[0]["alias"] == "UI only"
 
-    mapping = yaml.safe_load(
-        (config_dir / ".gitops/mappings/automation.yaml").read_text(encoding="utf-8")
-    )
+    mapping = read_yaml(config_dir / ".gitops/mappings/automation.yaml")
     assert len(mapping["entries"]) == 3
 
 
-def test_sync_updates_from_domain_changes(tmp_path: Path) -> None:
-    main, config_dir = load_main(tmp_path)
-
-    write_yaml(
-        config_dir / "packages/wakeup/automation.yaml",
-        [{"alias": "Wake up", "trigger": []}],
-    )
-    write_yaml(
-        config_dir / "automations.yaml",
-        [{"alias": "UI only", "trigger": []}],
-    )
-
+def test_sync_updates_from_domain_changes(wakeup_config, write_yaml, read_yaml) -> None:
+    main, config_dir = wakeup_config
     main.sync_yaml_modules()
 
-    domain_items = yaml.safe_load((config_dir / "automations.yaml").read_text(encoding="utf-8"))
+    domain_items = read_yaml(config_dir / "automations.yaml")
     for item in domain_items:
         if item.get("alias") == "Wake up":
             item["alias"] = "Wake up updated"
@@ -171,38 +145,26 @@ def test_sync_updates_from_domain_changes(tmp_path: Path) -> None:
 
     main.sync_yaml_modules()
 
-    module_items = yaml.safe_load(
-        (config_dir / "packages/wakeup/automation.yaml").read_text(encoding="utf-8")
-    )
+    module_items = read_yaml(config_dir / "packages/wakeup/automation.yaml")
     assert module_items[0]["alias"] == "Wake up updated"
 
-    unassigned_items = yaml.safe_load(
-        (config_dir / "packages/unassigned/automation.yaml").read_text(encoding="utf-8")
-    )
+    unassigned_items = read_yaml(config_dir / "packages/unassigned/automation.yaml")
     assert unassigned_items[0]["alias"] == "UI updated"
 
 
-def test_sync_prefers_modules_for_assigned_when_both_change(tmp_path: Path) -> None:
-    main, config_dir = load_main(tmp_path)
-
-    write_yaml(
-        config_dir / "packages/wakeup/automation.yaml",
-        [{"alias": "Wake up", "trigger": []}],
-    )
-    write_yaml(
-        config_dir / "automations.yaml",
-        [{"alias": "UI only", "trigger": []}],
-    )
-
+def test_sync_prefers_modules_for_assigned_when_both_change(
+    wakeup_config, write_yaml, read_yaml
+) -> None:
+    main, config_dir = wakeup_config
     main.sync_yaml_modules()
 
     module_path = config_dir / "packages/wakeup/automation.yaml"
-    module_items = yaml.safe_load(module_path.read_text(encoding="utf-8"))
+    module_items = read_yaml(module_path)
     module_items[0]["alias"] = "Module wins"
     write_yaml(module_path, module_items)
 
     domain_path = config_dir / "automations.yaml"
-    domain_items = yaml.safe_load(domain_path.read_text(encoding="utf-8"))
+    domain_items = read_yaml(domain_path)
     for item in domain_items:
         if item.get("alias") == "Wake up":
             item["alias"] = "Domain loses"
@@ -212,16 +174,16 @@ def test_sync_prefers_modules_for_assigned_when_both_change(tmp_path: Path) -> N
 
     main.sync_yaml_modules()
 
-    module_items = yaml.safe_load(module_path.read_text(encoding="utf-8"))
+    module_items = read_yaml(module_path)
     assert module_items[0]["alias"] == "Module wins"
 
-    unassigned_items = yaml.safe_load(
-        (config_dir / "packages/unassigned/automation.yaml").read_text(encoding="utf-8")
-    )
+    unassigned_items = read_yaml(config_dir / "packages/unassigned/automation.yaml")
     assert unassigned_items[0]["alias"] == "UI wins"
 
 
-def test_sync_helpers_split_to_domain_files(tmp_path: Path) -> None:
+def test_sync_helpers_split_to_domain_files(
+    tmp_path: Path, load_main, write_yaml, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_yaml(
@@ -234,17 +196,53 @@ def test_sync_helpers_split_to_domain_files(tmp_path: Path) -> None:
 
     main.sync_yaml_modules()
 
-    input_boolean = yaml.safe_load(
-        (config_dir / "input_boolean.yaml").read_text(encoding="utf-8")
-    )
-    input_datetime = yaml.safe_load(
-        (config_dir / "input_datetime.yaml").read_text(encoding="utf-8")
-    )
+    input_boolean = read_yaml(config_dir / "input_boolean.yaml")
+    input_datetime = read_yaml(config_dir / "input_datetime.yaml")
     assert "kitchen_motion" in input_boolean
     assert "wake_time" in input_datetime
 
 
-def test_template_includes_expand_into_domain_outputs(tmp_path: Path) -> None:
+def test_sync_skips_domains_with_unchanged_inputs(
+    tmp_path: Path, load_main, write_yaml, read_yaml, get_yaml_modules_module, monkeypatch
+) -> None:
+    main, config_dir = load_main(tmp_path)
+    yaml_modules = get_yaml_modules_module()
+
+    write_yaml(
+        config_dir / "packages/wakeup/automation.yaml",
+        [{"alias": "Wake up", "trigger": []}],
+    )
+    write_yaml(config_dir / "automations.yaml", [{"alias": "UI only", "trigger": []}])
+    main.sync_yaml_modules()
+
+    parsed: list[str] = []
+    original_parse = yaml_modules._parse_list_domain
+
+    def tracking_parse(spec, *args, **kwargs):
+        parsed.append(spec.key)
+        return original_parse(spec, *args, **kwargs)
+
+    monkeypatch.setattr(yaml_modules, "_parse_list_domain", tracking_parse)
+
+    result = main.sync_yaml_modules()
+    assert result["changed_files"] == []
+    assert "automation" not in parsed
+
+    domain_items = read_yaml(config_dir / "automations.yaml")
+    for item in domain_items:
+        if item.get("alias") == "UI only":
+            item["alias"] = "UI updated"
+    write_yaml(config_dir / "automations.yaml", domain_items)
+
+    main.sync_yaml_modules()
+    assert "automation" in parsed
+    unassigned_items = read_yaml(config_dir / "packages/unassigned/automation.yaml")
+    assert unassigned_items[0]["alias"] == "UI updated"
+
+
+def test_template_includes_expand_into_domain_outputs(
+    tmp_path: Path, load_main, write_text, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_text(
@@ -262,7 +260,7 @@ def test_template_includes_expand_into_domain_outputs(tmp_path: Path) -> None:
     result = main.sync_yaml_modules()
     assert result["status"] == "synced"
 
-    domain_items = yaml.safe_load((config_dir / "automations.yaml").read_text(encoding="utf-8"))
+    domain_items = read_yaml(config_dir / "automations.yaml")
     wake_up = next(item for item in domain_items if item.get("id") == "wake_up")
     assert wake_up["action"][0]["service"] == "logbook.log"
 
@@ -270,7 +268,36 @@ def test_template_includes_expand_into_domain_outputs(tmp_path: Path) -> None:
     assert "!/packages/common_actions.template.yaml" in module_text
 
 
-def test_template_backed_domain_edits_generate_diff_and_preserve_module_tag(tmp_path: Path) -> None:
+def test_template_glob_candidates_scan_only_literal_prefix(
+    tmp_path: Path, load_main, write_text
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    write_text(config_dir / "packages/shared/b.template.yaml", "[]\n")
+    write_text(config_dir / "packages/shared/a.template.yaml", "[]\n")
+    write_text(config_dir / "packages/other/c.template.yaml", "[]\n")
+    base_path = config_dir / "packages/demo/automation.yaml"
+
+    matches = yaml_tags.resolve_template_candidates(
+        "!/packages/shared/*.template.yaml",
+        config_dir=config_dir,
+        base_path=base_path,
+        warnings=[],
+    )
+    assert [path.name for path in matches] == ["a.template.yaml", "b.template.yaml"]
+
+    missing = yaml_tags.resolve_template_candidates(
+        "!/packages/missing/*.template.yaml",
+        config_dir=config_dir,
+        base_path=base_path,
+        warnings=[],
+    )
+    assert missing == []
+
+
+def test_template_backed_domain_edits_generate_diff_and_preserve_module_tag(
+    tmp_path: Path, load_main, write_text, write_yaml, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_text(
@@ -288,7 +315,7 @@ def test_template_backed_domain_edits_generate_diff_and_preserve_module_tag(tmp_
     main.sync_yaml_modules()
 
     domain_path = config_dir / "automations.yaml"
-    domain_items = yaml.safe_load(domain_path.read_text(encoding="utf-8"))
+    domain_items = read_yaml(domain_path)
     for item in domain_items:
         if item.get("id") != "wake_up":
             continue
@@ -308,13 +335,15 @@ def test_template_backed_domain_edits_generate_diff_and_preserve_module_tag(tmp_
     assert "packages/wakeup/automation.yaml" in diff_text
     assert "diff --git a/packages/common_actions.template.yaml b/packages/common_actions.template.yaml" in diff_text
 
-    domain_items_after = yaml.safe_load(domain_path.read_text(encoding="utf-8"))
+    domain_items_after = read_yaml(domain_path)
     wake_up = next(item for item in domain_items_after if item.get("id") == "wake_up")
     assert wake_up["alias"] == "Wake up updated"
     assert wake_up["action"][0]["service"] == "logbook.log"
 
 
-def test_template_fingerprints_change_when_template_changes(tmp_path: Path) -> None:
+def test_template_fingerprints_change_when_template_changes(
+    tmp_path: Path, load_main, write_text, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     template_path = config_dir / "packages/common_actions.template.yaml"
@@ -333,7 +362,7 @@ def test_template_fingerprints_change_when_template_changes(tmp_path: Path) -> N
     main.sync_yaml_modules()
 
     mapping_path = config_dir / ".gitops/mappings/automation.yaml"
-    mapping = yaml.safe_load(mapping_path.read_text(encoding="utf-8"))
+    mapping = read_yaml(mapping_path)
     first_fp = next(entry["fingerprint"] for entry in mapping["entries"] if entry["id"] == "wake_up")
 
     write_text(
@@ -342,14 +371,16 @@ def test_template_fingerprints_change_when_template_changes(tmp_path: Path) -> N
     )
     main.sync_yaml_modules()
 
-    mapping_after = yaml.safe_load(mapping_path.read_text(encoding="utf-8"))
+    mapping_after = read_yaml(mapping_path)
     second_fp = next(
         entry["fingerprint"] for entry in mapping_after["entries"] if entry["id"] == "wake_up"
     )
     assert first_fp != second_fp
 
 
-def test_sync_groups_mapping_domain_round_trip(tmp_path: Path) -> None:
+def test_sync_groups_mapping_domain_round_trip(
+    tmp_path: Path, load_main, write_yaml, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_yaml(
@@ -359,7 +390,7 @@ def test_sync_groups_mapping_domain_round_trip(tmp_path: Path) -> None:
 
     main.sync_yaml_modules()
 
-    groups_domain = yaml.safe_load((config_dir / "groups.yaml").read_text(encoding="utf-8"))
+    groups_domain = read_yaml(config_dir / "groups.yaml")
     assert "kitchen" in groups_domain
 
     groups_domain["ui_only"] = {"name": "UI only", "entities": ["light.ui"]}
@@ -367,13 +398,13 @@ def test_sync_groups_mapping_domain_round_trip(tmp_path: Path) -> None:
 
     main.sync_yaml_modules()
 
-    unassigned = yaml.safe_load(
-        (config_dir / "packages/unassigned/groups.yaml").read_text(encoding="utf-8")
-    )
+    unassigned = read_yaml(config_dir / "packages/unassigned/groups.yaml")
     assert "ui_only" in unassigned
 
 
-def test_groups_resolve_include_tags_in_domain_output(tmp_path: Path) -> None:
+def test_groups_resolve_include_tags_in_domain_output(
+    tmp_path: Path, load_main, write_text, write_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_yaml(config_dir / "groups/includes/members.yaml", ["light.a", "light.b"])
@@ -388,14 +419,75 @@ def test_groups_resolve_include_tags_in_domain_output(tmp_path: Path) -> None:
 
     domain_text = (config_dir / "groups.yaml").read_text(encoding="utf-8")
     assert "!include" not in domain_text
-    domain_data = yaml.safe_load(domain_text)
+    domain_data = yaml.load(domain_text, Loader=YAML_LOADER)
     assert domain_data["living_room"]["entities"] == ["light.a", "light.b"]
 
 
-def test_modules_index_includes_groups_one_offs_and_unassigned(tmp_path: Path) -> None:
-    load_main(tmp_path)
+def test_include_dir_list_reads_sorted_yaml_files_only(
+    tmp_path: Path, load_main, write_text, write_yaml
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    write_yaml(config_dir / "groups/members/b.yml", "light.b")
+    write_yaml(config_dir / "groups/members/a.yaml", "light.a")
+    write_text(config_dir / "groups/members/notes.txt", "ignored\n")
+    (config_dir / "groups/members/nested.yaml").mkdir()
+
+    warnings: list[str] = []
+    expanded = yaml_tags.expand_includes(
+        yaml_tags.TaggedValue(tag="!include_dir_list", value="members"),
+        config_dir=config_dir,
+        base_path=config_dir / "groups/house.yaml",
+        warnings=warnings,
+        resolve_templates=False,
+        resolve_ha_includes=True,
+    )
+    assert expanded == ["light.a", "light.b"]
+    assert warnings == []
+
+
+def test_include_dir_merge_list_keeps_order_for_large_directories(
+    tmp_path: Path, load_main, write_text, write_yaml, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    for index in range(8):
+        write_yaml(config_dir / f"groups/members/{index:02d}.yaml", [f"light.{index}"])
+    write_text(config_dir / "groups/members/99_broken.yaml", "key: [unclosed\n")
+    for path in (config_dir / "groups/members").iterdir():
+        old_ns = path.stat().st_mtime_ns - 10_000_000_000
+        os.utime(path, ns=(old_ns, old_ns))
+
+    def expand() -> tuple[object, list[str]]:
+        warnings: list[str] = []
+        expanded = yaml_tags.expand_includes(
+            yaml_tags.TaggedValue(tag="!include_dir_merge_list", value="members"),
+            config_dir=config_dir,
+            base_path=config_dir / "groups/house.yaml",
+            warnings=warnings,
+            resolve_templates=False,
+            resolve_ha_includes=True,
+        )
+        return expanded, warnings
+
+    expanded, warnings = expand()
+    assert expanded == [f"light.{index}" for index in range(8)]
+    assert len(warnings) == 1
+    assert "99_broken.yaml" in warnings[0]
+
+    # Cached files are loaded inline; only the broken file is parsed again, without a pool.
+    def no_pool(*args, **kwargs):
+        raise AssertionError("warm include directories must not start a thread pool")
+
+    monkeypatch.setattr(yaml_tags, "ThreadPoolExecutor", no_pool)
+    assert expand() == (expanded, warnings)
+
+
+def test_modules_index_includes_groups_one_offs_and_unassigned(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module
+) -> None:
+    _, config_dir = load_main(tmp_path)
     yaml_modules = get_yaml_modules_module()
-    config_dir = Path(os.environ["HASS_CONFIG_DIR"])
 
     write_yaml(
         config_dir / "groups/custom.yaml",
@@ -415,7 +507,9 @@ def test_modules_index_includes_groups_one_offs_and_unassigned(tmp_path: Path) -
     assert "groups/groups.unassigned.yaml" in modules["unassigned:groups"]["files"]
 
 
-def test_preview_yaml_modules_separates_build_and_update(tmp_path: Path) -> None:
+def test_preview_yaml_modules_separates_build_and_update(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module
+) -> None:
     _, config_dir = load_main(tmp_path)
 
     write_yaml(
@@ -439,7 +533,209 @@ def test_preview_yaml_modules_separates_build_and_update(tmp_path: Path) -> None
     assert all(not path.startswith("system/") for path in build_paths | update_paths)
 
 
-def test_automation_ids_are_normalized_and_unique(tmp_path: Path) -> None:
+def test_preview_yaml_modules_reuses_result_until_yaml_changes(
+    tmp_path: Path, load_main, write_yaml, get_yaml_modules_module, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _, config_dir = load_main(tmp_path)
+
+    target = config_dir / "packages/wakeup/automation.yaml"
+    write_yaml(target, [{"alias": "Wake up", "trigger": [], "action": []}])
+    # Only files with settled mtimes let the preview be cached.
+    for path in config_dir.rglob("*"):
+        if path.is_file():
+            old_ns = path.stat().st_mtime_ns - 10_000_000_000
+            os.utime(path, ns=(old_ns, old_ns))
+
+    yaml_modules = get_yaml_modules_module()
+    calls = []
+    original = yaml_modules._sync_yaml_modules_state
+
+    def counting_sync(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(yaml_modules, "_sync_yaml_modules_state", counting_sync)
+
+    first = yaml_modules.preview_yaml_modules()
+    second = yaml_modules.preview_yaml_modules()
+    assert second == first
+    assert len(calls) == 1
+
+    write_yaml(target, [{"alias": "Wake up later", "trigger": [], "action": []}])
+    third = yaml_modules.preview_yaml_modules()
+    assert len(calls) == 2
+    assert third != first
+
+    # A same-size rewrite within the same mtime tick must not reuse the racy preview.
+    stat_result = target.stat()
+    write_yaml(target, [{"alias": "Wake up LATER", "trigger": [], "action": []}])
+    os.utime(target, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    fourth = yaml_modules.preview_yaml_modules()
+    assert len(calls) == 3
+    assert fourth != third
+
+
+def test_yaml_tree_signature_covers_uppercase_extensions(
+    tmp_path: Path, load_main, write_text
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    fs_utils = sys.modules["gitops_bridge.fs_utils"]
+    target = config_dir / "packages/wakeup/automation.YAML"
+    write_text(target, "[]\n")
+    old_ns = target.stat().st_mtime_ns - 10_000_000_000
+    os.utime(target, ns=(old_ns, old_ns))
+    before = fs_utils.yaml_tree_signature(target.parent)
+
+    os.utime(target, ns=(old_ns - 1, old_ns - 1))
+    after = fs_utils.yaml_tree_signature(target.parent)
+    assert before is not None
+    assert after != before
+
+
+def test_write_yaml_if_changed_skips_rendering_until_file_is_edited(
+    tmp_path: Path, load_main, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    fs_utils = sys.modules["gitops_bridge.fs_utils"]
+    target = config_dir / "packages/wakeup/automation.yaml"
+    payload = [{"id": "wake_up", "alias": "Wake up"}]
+
+    assert fs_utils.write_yaml_if_changed(target, payload) is True
+    rendered = target.read_text(encoding="utf-8")
+
+    dumps = []
+    original_dump = fs_utils.yaml_dump
+
+    def counting_dump(data):
+        dumps.append(data)
+        return original_dump(data)
+
+    monkeypatch.setattr(fs_utils, "yaml_dump", counting_dump)
+
+    # Just written, so the mtime is racy: the memo is not trusted and content is compared.
+    assert fs_utils.write_yaml_if_changed(target, payload) is False
+    assert len(dumps) == 1
+
+    old_ns = target.stat().st_mtime_ns - 10_000_000_000
+    os.utime(target, ns=(old_ns, old_ns))
+    assert fs_utils.write_yaml_if_changed(target, payload) is False
+    assert len(dumps) == 2
+    assert fs_utils.write_yaml_if_changed(target, payload) is False
+    assert len(dumps) == 2
+
+    target.write_text("# edited by hand\n", encoding="utf-8")
+    assert fs_utils.write_yaml_if_changed(target, payload) is True
+    assert target.read_text(encoding="utf-8") == rendered
+
+
+def test_yaml_load_cache_returns_fresh_copies_and_sees_edits(
+    tmp_path: Path, load_main, write_yaml
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    fs_utils = sys.modules["gitops_bridge.fs_utils"]
+    target = config_dir / "automations.yaml"
+    write_yaml(target, [{"id": "a", "alias": "A"}])
+
+    first, lines, error = fs_utils.yaml_load(target)
+    assert error is None
+    assert lines == [1]
+    first[0]["alias"] = "mutated"
+
+    second, _lines, _error = fs_utils.yaml_load(target)
+    assert second == [{"id": "a", "alias": "A"}]
+
+    write_yaml(target, [{"id": "a", "alias": "A"}, {"id": "b", "alias": "B"}])
+    third, third_lines, _error = fs_utils.yaml_load(target)
+    assert [entry["id"] for entry in third] == ["a", "b"]
+    assert third_lines == [1, 3]
+
+
+def test_yaml_load_sees_same_size_edit_within_mtime_tick(
+    tmp_path: Path, load_main, write_text
+) -> None:
+    _, config_dir = load_main(tmp_path)
+    fs_utils = sys.modules["gitops_bridge.fs_utils"]
+    target = config_dir / "automations.yaml"
+    write_text(target, "- id: a\n")
+    stat_result = target.stat()
+
+    assert fs_utils.yaml_load(target)[0] == [{"id": "a"}]
+
+    write_text(target, "- id: b\n")
+    os.utime(target, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    assert fs_utils.yaml_load(target)[0] == [{"id": "b"}]
+
+
+def test_yaml_dump_fast_renders_tags_like_yaml_dump(tmp_path: Path, load_main) -> None:
+    load_main(tmp_path)
+    fs_utils = sys.modules["gitops_bridge.fs_utils"]
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    data = {
+        "alias": "Wake up",
+        "action": yaml_tags.TaggedValue(tag="!include", value="actions/wake.yaml"),
+        "secret": yaml_tags.TaggedValue(tag="!secret", value="it's: tricky"),
+        "nested": yaml_tags.TaggedValue(tag="!include_dir_list", value=None),
+    }
+
+    rendered = fs_utils.yaml_dump_fast(data)
+    assert "!include 'actions/wake.yaml'" in rendered
+    assert rendered == fs_utils.yaml_dump(data)
+
+def test_include_cache_shares_parses_and_sees_edits(tmp_path: Path, load_main, write_yaml) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    include = config_dir / "groups/includes/members.yaml"
+    write_yaml(include, ["light.a"])
+
+    def expand() -> object:
+        warnings: list[str] = []
+        value = yaml_tags.TaggedValue(tag="!include", value="includes/members.yaml")
+        expanded = yaml_tags.expand_includes(
+            {"one": value, "two": value},
+            config_dir=config_dir,
+            base_path=config_dir / "groups/house.yaml",
+            warnings=warnings,
+            resolve_templates=False,
+            resolve_ha_includes=True,
+        )
+        assert warnings == []
+        return expanded
+
+    first = expand()
+    assert first == {"one": ["light.a"], "two": ["light.a"]}
+    assert first["one"] is not first["two"]
+
+    write_yaml(include, ["light.a", "light.b"])
+    assert expand()["two"] == ["light.a", "light.b"]
+
+    stat_result = include.stat()
+    write_yaml(include, ["light.c", "light.d"])
+    os.utime(include, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    assert expand()["one"] == ["light.c", "light.d"]
+
+
+def test_expand_includes_reports_repeated_warnings_once(tmp_path: Path, load_main) -> None:
+    _, config_dir = load_main(tmp_path)
+    yaml_tags = sys.modules["gitops_bridge.yaml_tags"]
+    missing = yaml_tags.TaggedValue(tag="!include", value="includes/missing.yaml")
+
+    warnings = ["earlier warning"]
+    yaml_tags.expand_includes(
+        {"one": missing, "two": missing},
+        config_dir=config_dir,
+        base_path=config_dir / "groups/house.yaml",
+        warnings=warnings,
+        resolve_templates=False,
+        resolve_ha_includes=True,
+    )
+    assert warnings[0] == "earlier warning"
+    assert len(warnings) == 2
+    assert warnings[1].startswith("Missing include file:")
+
+
+def test_automation_ids_are_normalized_and_unique(
+    tmp_path: Path, load_main, write_yaml, read_yaml
+) -> None:
     main, config_dir = load_main(tmp_path)
 
     write_yaml(
@@ -453,8 +749,8 @@ def test_automation_ids_are_normalized_and_unique(tmp_path: Path) -> None:
 
     main.sync_yaml_modules()
 
-    a_items = yaml.safe_load((config_dir / "packages/a/automation.yaml").read_text(encoding="utf-8"))
-    b_items = yaml.safe_load((config_dir / "packages/b/automation.yaml").read_text(encoding="utf-8"))
+    a_items = read_yaml(config_dir / "packages/a/automation.yaml")
+    b_items = read_yaml(config_dir / "packages/b/automation.yaml")
 
     assert a_items[0]["id"] == "kitchen_lights"
     assert b_items[0]["id"] == "kitchen_lights_2"